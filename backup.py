@@ -0,0 +1,211 @@
+import argparse
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from banco import conectar_leitura
+from metricas import medir
+
+log = logging.getLogger("bancart")
+
+# --- BACKUP ONLINE ---
+# Cópias feitas com a API de backup do SQLite numa conexão própria, numa thread
+# própria, enquanto o caixa continua vendendo. Cada cópia é compactada (gzip) e
+# uma política de retenção apaga as antigas.
+#
+# Em WAL, um leitor não bloqueia quem escreve: copiar tudo num passo só
+# (PAGINAS_POR_PASSO = -1) é consistente e não trava o caixa. Em passos menores
+# o SQLite recomeça a cópia do zero se outra conexão gravar entre um passo e
+# outro, o que no pico de movimento pode não terminar nunca.
+#
+# Com journal DELETE (banco numa pasta de rede) é o contrário: o passo único
+# segura o lock SHARED a cópia inteira e todo COMMIT dos terminais espera (e
+# cai em "database is locked" depois do busy_timeout). Aí a cópia vai em passos
+# curtos, soltando o lock entre eles; se recomeçar vezes demais, desiste e
+# tenta de novo no próximo horário em vez de travar o caixa.
+
+PASTA_BACKUPS = "backups"
+PAGINAS_POR_PASSO = -1 # WAL
+PAGINAS_POR_PASSO_DELETE = 100 # Journal DELETE
+PAUSA_DELETE = 0.05 # Entre passos, com o lock solto
+MAX_RECOMECOS = 20 # Journal DELETE: cópias recomeçadas por escrita de outro terminal antes de desistir
+PREFIXO = "bancart_"
+FORMATO_DATA = "%Y-%m-%d_%H-%M-%S"
+RETENCAO = {'hora': 24, 'dia': 14, 'semana': 8} # Quantas cópias manter em cada faixa
+RESTOS = (".tmp", ".parcial") # Arquivos de trabalho de uma cópia em andamento
+RESTOS_IDADE_S = 3600 # Sem ser mexido há mais que isso = sobrou de uma cópia interrompida
+ESPERA_PARAR_S = 30 # Quanto o fechamento do sistema espera uma cópia em andamento terminar
+
+def desistir_se_recomecar(maximo=MAX_RECOMECOS):
+    # progress do backup: 'restantes' subindo = o SQLite recomeçou a cópia do zero
+    anterior = [None]; recomecos = [0]
+    def progresso(status, restantes, total):
+        if anterior[0] is not None and restantes > anterior[0]:
+            recomecos[0] += 1
+            if recomecos[0] > maximo: raise RuntimeError(f"banco em uso, cópia recomeçou {recomecos[0]} vezes; tenta no próximo horário")
+        anterior[0] = restantes
+    return progresso
+
+def fazer_snapshot(caminho_db, pasta=PASTA_BACKUPS, paginas=None, pausa=None):
+    # paginas/pausa = None: escolhe pelo journal do banco (ver acima)
+    origem = conectar_leitura(caminho_db) # Antes de criar qualquer arquivo na pasta; caminho errado não vira backup vazio
+    destino = os.path.join(pasta, f"{PREFIXO}{datetime.now().strftime(FORMATO_DATA)}.db.gz"); tmp = None
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=PREFIXO, suffix=".tmp", dir=pasta); os.close(fd) # Com o prefixo: se sobrar, limpar_restos acha
+        wal = origem.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        if paginas is None: paginas = PAGINAS_POR_PASSO if wal else PAGINAS_POR_PASSO_DELETE
+        if pausa is None: pausa = 0.005 if wal else PAUSA_DELETE
+        copia = sqlite3.connect(tmp)
+        try: origem.backup(copia, pages=paginas, sleep=pausa, progress=None if wal else desistir_se_recomecar())
+        finally: copia.close()
+        with open(tmp, "rb") as f, gzip.open(destino + ".parcial", "wb", compresslevel=6) as gz:
+            shutil.copyfileobj(f, gz, 1024 * 1024)
+        os.replace(destino + ".parcial", destino) # Só aparece com o nome final quando está completo
+    finally:
+        origem.close()
+        if tmp and os.path.exists(tmp): os.remove(tmp)
+        if os.path.exists(destino + ".parcial"): os.remove(destino + ".parcial")
+    return destino
+
+def listar_snapshots(pasta=PASTA_BACKUPS):
+    # [(data, caminho), ...] do mais novo para o mais antigo; ignora arquivos de fora (ex.: backups antigos)
+    snaps = []
+    if not os.path.isdir(pasta): return snaps
+    for nome in os.listdir(pasta):
+        if not (nome.startswith(PREFIXO) and nome.endswith(".db.gz")): continue
+        try: dt = datetime.strptime(nome[len(PREFIXO):-len(".db.gz")], FORMATO_DATA)
+        except ValueError: continue
+        snaps.append((dt, os.path.join(pasta, nome)))
+    return sorted(snaps, reverse=True)
+
+def _faixa(dt, regra):
+    if regra == 'hora': return dt.strftime("%Y-%m-%d %H")
+    if regra == 'dia': return dt.date()
+    return dt.isocalendar()[:2] # semana
+
+def aplicar_retencao(pasta=PASTA_BACKUPS, retencao=RETENCAO):
+    # Mantém a cópia mais nova de cada uma das últimas N horas/dias/semanas
+    snaps = listar_snapshots(pasta); manter = set()
+    for regra, qtd in retencao.items():
+        vistas = set()
+        for dt, arq in snaps:
+            faixa = _faixa(dt, regra)
+            if faixa in vistas: continue
+            if len(vistas) >= qtd: break
+            vistas.add(faixa); manter.add(arq)
+    apagados = [arq for _, arq in snaps if arq not in manter]
+    for arq in apagados: os.remove(arq)
+    return apagados + limpar_restos(pasta)
+
+def limpar_restos(pasta=PASTA_BACKUPS, idade_s=RESTOS_IDADE_S):
+    # Temporários de cópias interrompidas (queda de energia, sistema fechado no meio); os recentes podem ser de uma cópia rodando agora
+    if not os.path.isdir(pasta): return []
+    limite = time.time() - idade_s; apagados = []
+    for nome in os.listdir(pasta):
+        arq = os.path.join(pasta, nome)
+        if nome.startswith(PREFIXO) and nome.endswith(RESTOS) and os.path.getmtime(arq) < limite:
+            os.remove(arq); apagados.append(arq)
+    return apagados
+
+def _descompactar(arquivo, destino):
+    with gzip.open(arquivo, "rb") as gz, open(destino, "wb") as f:
+        shutil.copyfileobj(gz, f, 1024 * 1024)
+
+def verificar(arquivo):
+    # Devolve (ok, mensagem)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "verificar.db")
+        try:
+            _descompactar(arquivo, db)
+            conn = sqlite3.connect(db)
+            try:
+                res = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                versao = conn.execute("PRAGMA user_version").fetchone()[0]
+                vendas = conn.execute("SELECT COUNT(*) FROM vendas").fetchone()[0]
+            finally: conn.close()
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            return False, f"Arquivo inválido: {e}"
+    if res != "ok": return False, f"Falha de integridade: {res}"
+    return True, f"OK (esquema v{versao}, {vendas} vendas)"
+
+def restaurar(arquivo, caminho_db):
+    # Feche o sistema antes: a cópia substitui todo o conteúdo do banco
+    ok, msg = verificar(arquivo)
+    if not ok: raise ValueError(msg)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "restaurar.db"); _descompactar(arquivo, db)
+        origem = sqlite3.connect(db); destino = sqlite3.connect(caminho_db)
+        try: origem.backup(destino)
+        finally: destino.close(); origem.close()
+    return msg
+
+class AgendadorBackup:
+    # Faz uma cópia a cada 'intervalo_min' minutos, só dentro do horário [hora_inicio, hora_fim)
+    def __init__(self, caminho_db, intervalo_min=60, hora_inicio=0, hora_fim=24, pasta=PASTA_BACKUPS, ao_comecar=None, ao_terminar=None):
+        self.caminho_db = caminho_db
+        self.intervalo_min = intervalo_min
+        self.hora_inicio, self.hora_fim = hora_inicio, hora_fim
+        self.pasta = pasta
+        self.ao_comecar = ao_comecar # ao_comecar(); chamado na thread do backup (ex.: barra de progresso)
+        self.ao_terminar = ao_terminar # ao_terminar(arquivo, erro); chamado na thread do backup
+        self.parar_evento = threading.Event()
+        self.thread = threading.Thread(target=self._rodar, name="bancart-backup", daemon=True)
+
+    def iniciar(self, atraso_s=5):
+        self.atraso_s = atraso_s # Deixa a abertura do sistema terminar antes da primeira cópia
+        self.thread.start()
+
+    def parar(self, espera_s=ESPERA_PARAR_S):
+        # Dá um tempo para a cópia em andamento terminar; se não der, os temporários ficam para limpar_restos
+        self.parar_evento.set()
+        if self.thread.is_alive(): self.thread.join(espera_s)
+
+    def executar_agora(self):
+        arquivo = erro = None
+        if self.ao_comecar: self.ao_comecar()
+        try:
+            with medir("backup.snapshot"): arquivo = fazer_snapshot(self.caminho_db, self.pasta)
+            aplicar_retencao(self.pasta)
+        except Exception as e:
+            erro = e
+            log.exception("Backup falhou: %s", e)
+        if self.ao_terminar: self.ao_terminar(arquivo, erro)
+        return arquivo
+
+    def _rodar(self):
+        if self.parar_evento.wait(self.atraso_s): return
+        while True:
+            if self.hora_inicio <= datetime.now().hour < self.hora_fim: self.executar_agora()
+            if self.parar_evento.wait(self.intervalo_min * 60): return
+
+def main():
+    ap = argparse.ArgumentParser(description="Backups do BANCART")
+    ap.add_argument("--banco", default=os.environ.get("BANCART_DB", "bancart_dados.db"))
+    ap.add_argument("--pasta", default=PASTA_BACKUPS)
+    sub = ap.add_subparsers(dest="comando", required=True)
+    sub.add_parser("agora", help="faz uma cópia agora e aplica a retenção")
+    sub.add_parser("listar", help="lista as cópias existentes")
+    sub.add_parser("verificar", help="confere a integridade de uma cópia").add_argument("arquivo")
+    sub.add_parser("restaurar", help="restaura uma cópia por cima do banco (feche o sistema antes)").add_argument("arquivo")
+    args = ap.parse_args()
+    if args.comando == "agora":
+        try: print(fazer_snapshot(args.banco, args.pasta))
+        except (OSError, sqlite3.Error) as e: raise SystemExit(f"Backup falhou: {e}")
+        for arq in aplicar_retencao(args.pasta): print(f"Removido: {arq}")
+    elif args.comando == "listar":
+        for dt, arq in listar_snapshots(args.pasta): print(f"{dt:%Y-%m-%d %H:%M:%S}  {os.path.getsize(arq):>12}  {arq}")
+    elif args.comando == "verificar":
+        ok, msg = verificar(args.arquivo); print(msg)
+        raise SystemExit(0 if ok else 1)
+    elif args.comando == "restaurar":
+        print(f"Restaurado: {restaurar(args.arquivo, args.banco)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+from metricas import contar, medir
+
+# --- CAMADA DE ACESSO A DADOS ---
+# Uma única conexão de longa duração (WAL) compartilhada por toda a aplicação.
+# O sqlite3 mantém o cache de statements preparados por conexão, então manter
+# a conexão aberta é o que faz o cache valer alguma coisa.
+#
+# Vários terminais podem abrir o mesmo arquivo. Em WAL, todos precisam estar na
+# mesma máquina (o WAL usa memória compartilhada); com o arquivo numa pasta de
+# rede, todos os terminais devem usar journal="DELETE".
+
+JOURNALS = ('WAL', 'DELETE')
+
+class SemEstoque(Exception):
+    # faltas = [(id, nome, qtd_pedida, estoque_disponivel), ...] — as linhas que não passaram
+    def __init__(self, faltas):
+        self.faltas = faltas
+        super().__init__(", ".join(f"{nome or f'produto {pid}'} (pedido {qtd}, tem {disp})" for pid, nome, qtd, disp in faltas))
+
+def intervalo_dia(dia, ate=None):
+    # data_hora é 'YYYY-MM-DD HH:MM:SS': ordenável como texto, então o dia é
+    # o intervalo [dia, dia seguinte) e usa o índice (status, data_hora).
+    # Com 'ate' (inclusivo), o período inteiro: [dia, ate + 1 dia)
+    seguinte = date.fromisoformat(ate or dia) + timedelta(days=1)
+    return dia, seguinte.isoformat()
+
+SQL_SOMAR_RESUMO = """INSERT INTO resumo_vendas (dia, pagamento, produto_nome, qtd, total) VALUES (?,?,?,?,?)
+    ON CONFLICT (dia, pagamento, produto_nome) DO UPDATE SET qtd=qtd+excluded.qtd, total=total+excluded.total"""
+
+def conectar_leitura(caminho, **opcoes):
+    # Só leitura (backup, relatórios): caminho errado dá erro em vez de criar um banco vazio
+    if not os.path.isfile(caminho): raise FileNotFoundError(f"Banco não encontrado: {caminho}")
+    return sqlite3.connect(Path(caminho).resolve().as_uri() + "?mode=ro", uri=True, **opcoes)
+
+class Banco:
+    def __init__(self, caminho, journal="WAL", somente_leitura=False):
+        if journal not in JOURNALS: raise ValueError(f"journal deve ser um de {JOURNALS}")
+        self.caminho = caminho
+        self.lock = threading.RLock()
+        # isolation_level=None: nós controlamos BEGIN/COMMIT (ver transacao())
+        opcoes = dict(check_same_thread=False, isolation_level=None, cached_statements=256)
+        if somente_leitura: self.conn = conectar_leitura(caminho, **opcoes) # Journal fica como os terminais deixaram
+        else:
+            self.conn = sqlite3.connect(caminho, **opcoes)
+            self.conn.execute(f"PRAGMA journal_mode={journal}")
+            self.conn.execute(f"PRAGMA synchronous={'NORMAL' if journal == 'WAL' else 'FULL'}") # Em WAL, NORMAL não corrompe; só evita fsync a cada commit
+        self.conn.execute("PRAGMA busy_timeout=5000")
+
+    def fechar(self):
+        with self.lock:
+            self.conn.close()
+
+    @contextmanager
+    def transacao(self):
+        with medir("banco.transacao"), self.lock: # Inclui a espera pelo lock (outra thread/terminal gravando)
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except BaseException:
+                # Inclusive um COMMIT que falhou (ex.: "database is locked" em journal DELETE): sem o ROLLBACK
+                # a conexão ficaria presa na transação, segurando o lock de escrita dos outros terminais
+                if self.conn.in_transaction: self.conn.execute("ROLLBACK")
+                raise
+
+    def consultar(self, sql, params=()):
+        with self.lock:
+            linhas = self.conn.execute(sql, params).fetchall()
+        contar("banco.linhas_lidas", len(linhas))
+        return linhas
+
+    def consultar_um(self, sql, params=()):
+        with self.lock:
+            linha = self.conn.execute(sql, params).fetchone()
+        contar("banco.linhas_lidas")
+        return linha
+
+    def iterar(self, sql, params=(), lote=500):
+        # Para resultados grandes: entrega as linhas em lotes, sem montar a lista inteira
+        with self.lock:
+            cur = self.conn.execute(sql, params)
+            try:
+                while True:
+                    linhas = cur.fetchmany(lote)
+                    if not linhas: return
+                    contar("banco.linhas_lidas", len(linhas))
+                    yield from linhas
+            finally: cur.close()
+
+    # --- PRODUTOS ---
+    # As escritas devolvem as linhas de produto como ficaram, para o cache da
+    # tela ser corrigido só naquela linha em vez de recarregar tudo.
+    SQL_PRODUTO = "SELECT id, nome, preco, estoque, codigo FROM produtos WHERE id=?"
+
+    def listar_produtos(self):
+        return self.consultar("SELECT id, nome, preco, estoque, codigo FROM produtos ORDER BY id")
+
+    def inserir_produto(self, nome, preco, estoque, codigo):
+        with self.transacao() as c:
+            pid = c.execute("INSERT INTO produtos (nome,preco,estoque,codigo) VALUES (?,?,?,?)", (nome, preco, estoque, codigo)).lastrowid
+            return c.execute(self.SQL_PRODUTO, (pid,)).fetchone()
+
+    def atualizar_produto(self, pid, nome, preco, estoque, codigo):
+        with self.transacao() as c:
+            c.execute("UPDATE produtos SET nome=?,preco=?,estoque=?,codigo=? WHERE id=?", (nome, preco, estoque, codigo, pid))
+            return c.execute(self.SQL_PRODUTO, (pid,)).fetchone()
+
+    def excluir_produto(self, pid):
+        with self.transacao() as c:
+            c.execute("DELETE FROM produtos WHERE id=?", (pid,))
+
+    # --- VENDAS ---
+    # Conferência e baixa de estoque acontecem dentro da mesma transação
+    # BEGIN IMMEDIATE: o lock de escrita fica com este terminal até o COMMIT,
+    # então ninguém vende a mesma última unidade entre a conferência e a baixa.
+    def _produtos_por_id(self, c, ids):
+        ids = list(ids)
+        return c.execute(f"SELECT id, nome, preco, estoque, codigo FROM produtos WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall()
+
+    def _baixar_estoque(self, c, pedidos):
+        # pedidos = {id: qtd}; levanta SemEstoque com todas as linhas que falharam
+        achados = {l[0]: l for l in self._produtos_por_id(c, pedidos)}
+        faltas = [(pid, achados[pid][1] if pid in achados else None, qtd, achados[pid][3] if pid in achados else 0)
+            for pid, qtd in pedidos.items() if pid not in achados or achados[pid][3] < qtd]
+        if faltas: raise SemEstoque(faltas)
+        cur = c.executemany("UPDATE produtos SET estoque=estoque-? WHERE id=? AND estoque>=?", [(qtd, pid, qtd) for pid, qtd in pedidos.items()])
+        if cur.rowcount != len(pedidos): raise SemEstoque([(pid, achados[pid][1], qtd, achados[pid][3]) for pid, qtd in pedidos.items()])
+        return achados
+
+    def _somar_pedidos(self, itens):
+        pedidos = {}
+        for pid, qtd in itens: pedidos[pid] = pedidos.get(pid, 0) + qtd
+        return pedidos
+
+    def _lancar_na_mesa(self, c, mesa, itens, dt):
+        achados = self._baixar_estoque(c, self._somar_pedidos(itens))
+        c.executemany("INSERT INTO vendas (mesa_id,produto_nome,qtd,total,data_hora,status) VALUES (?,?,?,?,?,?)",
+            [(mesa, achados[pid][1], qtd, achados[pid][2] * qtd, dt, 'ABERTA') for pid, qtd in itens])
+        return self._produtos_por_id(c, achados)
+
+    def lancar_itens_mesa(self, mesa, itens, dt):
+        # itens = [(id, qtd), ...]; tudo ou nada
+        with self.transacao() as c:
+            return self._lancar_na_mesa(c, mesa, itens, dt)
+
+    def lancar_pedidos_mesa(self, pedidos, dt):
+        # pedidos = [(mesa, itens), ...]: vários pedidos num COMMIT só. Cada um fica
+        # num SAVEPOINT, então o que não tiver estoque volta sozinho sem derrubar os
+        # outros. Devolve, na ordem, as linhas de produto alteradas ou o SemEstoque.
+        resultados = []
+        with self.transacao() as c:
+            for mesa, itens in pedidos:
+                c.execute("SAVEPOINT pedido")
+                try:
+                    resultados.append(self._lancar_na_mesa(c, mesa, itens, dt))
+                except SemEstoque as e:
+                    c.execute("ROLLBACK TO pedido")
+                    resultados.append(e)
+                c.execute("RELEASE pedido")
+        return resultados
+
+    def lancar_item_mesa(self, mesa, pid, qtd, dt):
+        return self.lancar_itens_mesa(mesa, [(pid, qtd)], dt)
+
+    def itens_mesa(self, mesa):
+        return self.consultar("SELECT id,produto_nome,qtd,total FROM vendas WHERE mesa_id=? AND status='ABERTA'", (mesa,))
+
+    def fechar_mesa(self, mesa, pagamento):
+        with self.transacao() as c:
+            resumo = c.execute("""SELECT substr(data_hora, 1, 10), ?, produto_nome, SUM(qtd), SUM(total)
+                FROM vendas WHERE mesa_id=? AND status='ABERTA' GROUP BY 1, 3""", (pagamento, mesa)).fetchall()
+            c.executemany(SQL_SOMAR_RESUMO, resumo)
+            c.execute("UPDATE vendas SET status='FECHADA', pagamento=? WHERE mesa_id=? AND status='ABERTA'", (pagamento, mesa))
+
+    def resumo_mesas(self, mesas=None):
+        # [(mesa, itens, total, aberta_em), ...]: na abertura (todas) ou quando outro terminal mexeu
+        # em algumas mesas; fora isso o MapaMesas se atualiza sozinho
+        sql = "SELECT mesa_id, SUM(qtd), SUM(total), MIN(data_hora) FROM vendas WHERE status='ABERTA' AND mesa_id > 0"
+        if mesas is None: return self.consultar(sql + " GROUP BY mesa_id")
+        mesas = list(mesas)
+        return self.consultar(sql + f" AND mesa_id IN ({','.join('?' * len(mesas))}) GROUP BY mesa_id", mesas)
+
+    def registrar_venda_avulsa(self, carrinho, pagamento, dt):
+        # Carrinho inteiro numa transação só; se uma linha não tiver estoque, nada é gravado
+        with self.transacao() as c:
+            achados = self._baixar_estoque(c, self._somar_pedidos((item['id'], item['qtd']) for item in carrinho))
+            c.executemany("INSERT INTO vendas (mesa_id, produto_nome, qtd, total, data_hora, pagamento, status) VALUES (?,?,?,?,?,?,?)",
+                [(0, item['nome'], item['qtd'], item['tot'], dt, pagamento, 'FECHADA') for item in carrinho])
+            c.executemany(SQL_SOMAR_RESUMO, [(dt[:10], pagamento, item['nome'], item['qtd'], item['tot']) for item in carrinho])
+            return self._produtos_por_id(c, achados)
+
+    def vendas_do_dia(self, dia):
+        return self.consultar("SELECT data_hora, mesa_id, produto_nome, total, pagamento, id FROM vendas WHERE status='FECHADA' AND data_hora >= ? AND data_hora < ? ORDER BY id DESC", intervalo_dia(dia))
+
+    # --- RESUMO (tabela resumo_vendas) ---
+    def total_do_dia(self, dia):
+        return self.consultar_um("SELECT COALESCE(SUM(total), 0) FROM resumo_vendas WHERE dia=?", (dia,))[0]
+
+    # --- MUDANÇAS (vários terminais no mesmo arquivo) ---
+    def data_version(self):
+        # Muda quando OUTRA conexão grava no arquivo; as escritas desta conexão não contam
+        return self.consultar_um("PRAGMA data_version")[0]
+
+    def ultima_mudanca(self):
+        # Pela sqlite_sequence (AUTOINCREMENT): continua certo mesmo com o registro podado
+        return self.consultar_um("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name='mudancas'), 0)")[0]
+
+    def mudancas_desde(self, seq, limite):
+        return self.consultar("SELECT seq, tipo, chave FROM mudancas WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limite))
+
+    def podar_mudancas(self, manter=10000):
+        # Terminal que ficar mais atrasado que isso recarrega tudo (ver ObservadorMudancas)
+        with self.transacao() as c:
+            c.execute("DELETE FROM mudancas WHERE seq <= (SELECT MAX(seq) FROM mudancas) - ?", (manter,))
+
+    def produtos_por_id(self, ids):
+        with self.lock:
+            return self._produtos_por_id(self.conn, ids)
@@ -0,0 +1,93 @@
+# Carga sintética sobre o núcleo (sem tela): catálogo realista + uma noite de
+# movimento em mesas e balcão. Mede p50/p99 e operações/s de cada operação.
+# Uso: python benchmarks/bench_carga.py [--produtos 5000] [--operacoes 20000]
+#      [--json atual.json] [--comparar base.json --tolerancia 0.25]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from banco import Banco, SemEstoque
+from migracoes import migrar
+from nucleo import MotorVendas, Carrinho
+from comum import gerar_catalogo, percentil
+
+# Peso de cada operação numa noite típica
+MIX = [('add_item_mesa', 55), ('finalizar_avulso', 15), ('busca', 20), ('fechar_mesa', 7), ('historico', 3)]
+
+def rodar(produtos, operacoes, mesas):
+    random.seed(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        banco = Banco(os.path.join(tmp, 'carga.db')); migrar(banco)
+        gerar_catalogo(banco, produtos, codigos=True, nomes_reais=True)
+        motor = MotorVendas(banco, mesas); motor.catalogo.carregar(motor.listar_produtos()); motor.mesas.carregar(motor.resumo_mesas())
+        ids = list(motor.catalogo.itens); nomes = [motor.catalogo.itens[p][1] for p in ids]
+        tempos = defaultdict(list); recusas = 0
+        escolhas = [op for op, peso in MIX for _ in range(peso)]
+        for _ in range(operacoes):
+            op = random.choice(escolhas)
+            t = time.perf_counter()
+            try:
+                if op == 'add_item_mesa':
+                    mesa, pid, qtd = random.randint(1, mesas), random.choice(ids), random.randint(1, 3)
+                    motor.aplicar_lancamento(mesa, [(pid, qtd)], motor.add_item_mesa(mesa, pid, qtd))
+                elif op == 'fechar_mesa':
+                    mesa = random.randint(1, mesas)
+                    motor.mesas.definir(mesa, motor.fechar_mesa(mesa, random.choice(["DINHEIRO", "PIX", "CRÉDITO", "DÉBITO"])))
+                elif op == 'finalizar_avulso':
+                    carrinho = Carrinho(motor.catalogo)
+                    for _ in range(random.randint(1, 4)): carrinho.adicionar(random.choice(ids), random.randint(1, 2))
+                    motor.aplicar_produtos(motor.finalizar_avulso(carrinho.itens, "PIX"))
+                elif op == 'busca':
+                    nome = random.choice(nomes).lower()
+                    for n in range(1, min(len(nome), 8) + 1): motor.buscar(nome[:n]) # Uma tecla por vez
+                elif op == 'historico':
+                    motor.historico()
+            except SemEstoque:
+                recusas += 1
+            tempos[op].append(time.perf_counter() - t)
+        # O mapa de mesas, corrigido operação a operação, tem que bater com o banco
+        no_banco = {m: (q, round(tot, 2)) for m, q, tot, _ in motor.resumo_mesas()}
+        if no_banco != {m: (e[0], round(e[1], 2)) for m, e in motor.mesas.ocupadas.items()}: raise SystemExit("ERRO: mapa de mesas diferente do banco")
+        banco.fechar()
+    res = {}
+    for op, ts in tempos.items():
+        ts.sort()
+        res[op] = {'n': len(ts), 'p50_ms': percentil(ts, 0.50), 'p99_ms': percentil(ts, 0.99), 'ops_s': len(ts) / sum(ts)}
+    return res, recusas
+
+def comparar(atual, base, tolerancia):
+    # Regressão = p99 pior que a base além da tolerância
+    regressoes = []
+    for op, r in atual.items():
+        if op in base and r['p99_ms'] > base[op]['p99_ms'] * (1 + tolerancia):
+            regressoes.append(f"{op}: p99 {base[op]['p99_ms']:.3f} -> {r['p99_ms']:.3f} ms")
+    return regressoes
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--produtos', type=int, default=5000)
+    ap.add_argument('--operacoes', type=int, default=20000)
+    ap.add_argument('--mesas', type=int, default=20)
+    ap.add_argument('--json', help="grava o resultado neste arquivo")
+    ap.add_argument('--comparar', help="resultado anterior (json) para acusar regressões")
+    ap.add_argument('--tolerancia', type=float, default=0.25)
+    args = ap.parse_args()
+    res, recusas = rodar(args.produtos, args.operacoes, args.mesas)
+    print(f"{'OPERAÇÃO':<18} {'N':>7} {'P50 (ms)':>10} {'P99 (ms)':>10} {'OPS/S':>10}")
+    for op, r in sorted(res.items()): print(f"{op:<18} {r['n']:>7} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {r['ops_s']:>10.0f}")
+    print(f"\nVendas recusadas por falta de estoque: {recusas}")
+    if args.json:
+        with open(args.json, "w", encoding='utf-8') as f: json.dump(res, f, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f: regressoes = comparar(res, json.load(f), args.tolerancia)
+        for r in regressoes: print(f"REGRESSÃO {r}")
+        if regressoes: raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Vazão de checkouts com N terminais (processos) batendo no mesmo arquivo de banco.
+# Uso: python benchmarks/bench_checkout.py [--terminais 1 2 4 8] [--segundos 5]
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from banco import Banco, SemEstoque
+from migracoes import migrar
+from comum import gerar_catalogo
+
+PRODUTOS = 200
+
+def preparar(caminho, estoque):
+    banco = Banco(caminho); migrar(banco)
+    gerar_catalogo(banco, PRODUTOS, estoque)
+    banco.fechar()
+
+def terminal(caminho, numero, segundos, saida):
+    random.seed(numero)
+    banco = Banco(caminho); ok = falhas = 0
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        carrinho = []
+        for _ in range(random.randint(1, 5)):
+            pid = random.randint(1, PRODUTOS); qtd = random.randint(1, 3)
+            carrinho.append({'id': pid, 'nome': f"Produto {pid - 1}", 'qtd': qtd, 'tot': 10.0 * qtd})
+        try: banco.registrar_venda_avulsa(carrinho, 'PIX', time.strftime("%Y-%m-%d %H:%M:%S")); ok += 1
+        except SemEstoque: falhas += 1
+    banco.fechar()
+    saida.put((ok, falhas))
+
+def rodada(terminais, segundos, estoque):
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'bench.db'); preparar(caminho, estoque)
+        saida = mp.Queue()
+        procs = [mp.Process(target=terminal, args=(caminho, n, segundos, saida)) for n in range(terminais)]
+        for p in procs: p.start()
+        resultados = [saida.get() for _ in procs]
+        for p in procs: p.join()
+        # Conferência: o estoque baixado tem que bater com o vendido, e nunca negativo
+        banco = Banco(caminho)
+        vendido = banco.consultar_um("SELECT COALESCE(SUM(qtd), 0) FROM vendas")[0]
+        restante, negativos = banco.consultar_um("SELECT SUM(estoque), SUM(estoque < 0) FROM produtos")
+        banco.fechar()
+    ok = sum(r[0] for r in resultados); falhas = sum(r[1] for r in resultados)
+    consistente = vendido + restante == PRODUTOS * estoque and not negativos
+    return ok, falhas, consistente
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--terminais', type=int, nargs='+', default=[1, 2, 4, 8])
+    ap.add_argument('--segundos', type=float, default=5)
+    ap.add_argument('--estoque', type=int, default=1000, help="estoque inicial de cada produto (baixo = mais vendas recusadas)")
+    args = ap.parse_args()
+    print(f"{'TERMINAIS':>9} {'CHECKOUTS/S':>12} {'RECUSADOS':>10} {'ESTOQUE OK':>11}")
+    for n in args.terminais:
+        ok, falhas, consistente = rodada(n, args.segundos, args.estoque)
+        print(f"{n:>9} {ok / args.segundos:>12.1f} {falhas:>10} {'sim' if consistente else 'NÃO':>11}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Latência das consultas quentes antes e depois dos índices da migração 4.
+# Uso: python benchmarks/bench_indices.py [--linhas 1000000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from banco import Banco, intervalo_dia
+from migracoes import migrar
+from comum import gerar_catalogo
+
+CONSULTAS = {
+    'mesa aberta': ("SELECT id,produto_nome,qtd,total FROM vendas WHERE mesa_id=? AND status='ABERTA'", lambda dia: (random.randint(1, 20),)),
+    'mesas ocupadas': ("SELECT DISTINCT mesa_id FROM vendas WHERE status='ABERTA'", lambda dia: ()),
+    'caixa do dia': ("SELECT data_hora, mesa_id, produto_nome, total, pagamento FROM vendas WHERE status='FECHADA' AND data_hora >= ? AND data_hora < ? ORDER BY id DESC", intervalo_dia),
+    'produto por código': ("SELECT id FROM produtos WHERE codigo=?", lambda dia: (f"789{random.randint(0, 4999):010d}",)),
+}
+
+def gerar(banco, linhas):
+    random.seed(42)
+    inicio = datetime(2024, 1, 1)
+    gerar_catalogo(banco, 5000, 100, codigos=True)
+    with banco.transacao() as c:
+        def vendas():
+            for i in range(linhas):
+                dt = inicio + timedelta(seconds=i * 30)
+                aberta = random.random() < 0.0005
+                yield (random.randint(0, 20), f"Produto {i % 5000}", 1, 10.0, dt.strftime("%Y-%m-%d %H:%M:%S"),
+                    None if aberta else 'PIX', 'ABERTA' if aberta else 'FECHADA')
+        c.executemany("INSERT INTO vendas (mesa_id,produto_nome,qtd,total,data_hora,pagamento,status) VALUES (?,?,?,?,?,?,?)", vendas())
+    return (inicio + timedelta(seconds=linhas * 15)).strftime("%Y-%m-%d") # Um dia no meio do histórico
+
+def medir(banco, dia, repeticoes):
+    res = {}
+    for nome, (sql, params) in CONSULTAS.items():
+        tempos = []
+        for _ in range(repeticoes):
+            t = time.perf_counter(); banco.consultar(sql, params(dia)); tempos.append(time.perf_counter() - t)
+        tempos.sort(); res[nome] = tempos[len(tempos) // 2] * 1000
+    return res
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--linhas', type=int, default=1000000)
+    ap.add_argument('--repeticoes', type=int, default=20)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        banco = Banco(os.path.join(tmp, 'bench.db'))
+        migrar(banco, ate=3) # Esquema como era antes dos índices
+        print(f"Gerando {args.linhas} vendas..."); dia = gerar(banco, args.linhas)
+        antes = medir(banco, dia, args.repeticoes)
+        t = time.perf_counter(); migrar(banco); criar = time.perf_counter() - t
+        banco.conn.execute("ANALYZE")
+        depois = medir(banco, dia, args.repeticoes)
+        banco.fechar()
+    print(f"\nMigração dos índices: {criar:.2f}s\n")
+    print(f"{'CONSULTA':<22} {'ANTES (ms)':>12} {'DEPOIS (ms)':>12}")
+    for nome in CONSULTAS: print(f"{nome:<22} {antes[nome]:>12.3f} {depois[nome]:>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Carga no servidor de pedidos: N clientes asyncio locais mandando pedidos de
+# mesa ao mesmo tempo (a casa cheia pedindo pelo cardápio). Mede latência
+# p50/p99, pedidos/s e confere no banco se tudo que foi aceito foi gravado.
+# Uso: python benchmarks/bench_pedidos.py [--clientes 200] [--pedidos 5000]
+#      [--sem-lote]   (um COMMIT por pedido, para comparar com o gravador em lote)
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from banco import Banco
+from migracoes import migrar
+from nucleo import MotorVendas
+from servidor_pedidos import ServidorPedidos
+from comum import gerar_catalogo, percentil
+
+async def enviar(porta, corpo):
+    reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+    try:
+        writer.write((f"POST /pedido HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(corpo)}\r\n\r\n").encode() + corpo)
+        await writer.drain()
+        resposta = await reader.read()
+    finally:
+        writer.close()
+    return int(resposta.split(b" ", 2)[1])
+
+async def cliente(porta, pedidos, nomes, mesas, tempos, status, aceitas):
+    while pedidos:
+        pedidos.pop()
+        itens = [{'nome': random.choice(nomes), 'qtd': random.randint(1, 3)} for _ in range(random.randint(1, 5))]
+        corpo = json.dumps({'mesa': random.randint(1, mesas), 'itens': itens}).encode()
+        t = time.perf_counter()
+        try: st = await enviar(porta, corpo)
+        except OSError: st = 'conexão'
+        tempos.append(time.perf_counter() - t); status[st] += 1
+        if st == 201: aceitas.append(len(itens))
+
+async def disparar(porta, n_pedidos, n_clientes, nomes, mesas):
+    pedidos = list(range(n_pedidos)); tempos = []; status = Counter(); aceitas = []
+    t = time.perf_counter()
+    await asyncio.gather(*(cliente(porta, pedidos, nomes, mesas, tempos, status, aceitas) for _ in range(n_clientes)))
+    return time.perf_counter() - t, sorted(tempos), status, sum(aceitas)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clientes", type=int, default=200)
+    ap.add_argument("--pedidos", type=int, default=5000)
+    ap.add_argument("--produtos", type=int, default=300)
+    ap.add_argument("--estoque", type=int, default=100000)
+    ap.add_argument("--mesas", type=int, default=20)
+    ap.add_argument("--sem-lote", action="store_true", help="grava cada pedido na sua própria transação")
+    args = ap.parse_args()
+    random.seed(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        banco = Banco(os.path.join(tmp, 'pedidos.db')); migrar(banco)
+        gerar_catalogo(banco, args.produtos, args.estoque)
+        motor = MotorVendas(banco, args.mesas); motor.catalogo.carregar(motor.listar_produtos())
+        nomes = [p[1] for p in motor.catalogo.itens.values()]
+        lotes = []
+        def ao_gravar(lancados, linhas): # Como a tela faz: caches em dia com o que foi gravado
+            lotes.append(len(lancados)); motor.aplicar_lancamentos(lancados, linhas)
+        servidor = ServidorPedidos(motor, "127.0.0.1", 0, max_lote=1 if args.sem_lote else 200, ao_gravar=ao_gravar)
+        if not servidor.iniciar(): raise SystemExit(f"Servidor não subiu: {servidor.erro}")
+        try:
+            duracao, tempos, status, esperadas = asyncio.run(disparar(servidor.porta, args.pedidos, args.clientes, nomes, args.mesas))
+        finally:
+            servidor.parar()
+        linhas = banco.consultar_um("SELECT COUNT(*) FROM vendas WHERE status='ABERTA'")[0]
+        no_banco = {m: (q, round(tot, 2)) for m, q, tot, _ in motor.resumo_mesas()}
+        mapa_ok = no_banco == {m: (e[0], round(e[1], 2)) for m, e in motor.mesas.ocupadas.items()}
+        banco.fechar()
+    print(f"{args.pedidos} pedidos, {args.clientes} clientes, {'sem lote' if args.sem_lote else 'em lote'}: "
+          f"{args.pedidos / duracao:.0f} pedidos/s em {duracao:.2f}s")
+    print(f"  latência p50 {percentil(tempos, 0.50):.1f} ms | p99 {percentil(tempos, 0.99):.1f} ms | máx {tempos[-1] * 1000:.1f} ms")
+    print(f"  respostas: {dict(status)} | {len(lotes)} transações com pedidos gravados | {linhas} linhas em vendas")
+    if not mapa_ok: raise SystemExit("ERRO: mapa de mesas diferente do banco")
+    if linhas != esperadas: raise SystemExit(f"ERRO: {esperadas} linhas aceitas, {linhas} gravadas")
+
+if __name__ == "__main__":
+    main()
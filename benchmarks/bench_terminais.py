@@ -0,0 +1,113 @@
+# Três terminais (um balcão e dois garçons) em processos separados, gravando
+# ao mesmo tempo no mesmo arquivo, cada um com seus caches sincronizados pelo
+# registro de mudanças. Mede em quanto tempo a escrita de um terminal aparece
+# nos outros e, no fim, confere se os caches de todos batem com o banco.
+# Uso: python benchmarks/bench_terminais.py [--segundos 10] [--produtos 2000]
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from banco import Banco, SemEstoque
+from migracoes import migrar
+from nucleo import MotorVendas, Carrinho
+from comum import gerar_catalogo, percentil
+
+ESTACOES = [('balcao', 'balcao'), ('garcom1', 'garcom'), ('garcom2', 'garcom')]
+SYNC_S = 0.3 # Mesmo intervalo da tela (SYNC_MS)
+PING_S = 0.2 # Cada terminal grava a hora atual no "seu" produto de ping; os outros medem quando viram
+LIMITE_S = 1.0
+
+def preparar(caminho, produtos):
+    banco = Banco(caminho); migrar(banco)
+    with banco.transacao() as c:
+        c.executemany("INSERT INTO produtos (nome,preco,estoque,codigo) VALUES (?,?,?,?)",
+            [(f"PING {nome}", 0.0, 0, None) for nome, _ in ESTACOES]) # ids 1..3
+    gerar_catalogo(banco, produtos, (200, 2000))
+    banco.fechar()
+
+def confere(motor):
+    # Caches do terminal x banco
+    produtos = {l[0]: tuple(l) for l in motor.listar_produtos()}
+    mesas = {m: (q, round(t, 2)) for m, q, t, _ in motor.resumo_mesas()}
+    return produtos == motor.catalogo.itens and mesas == {m: (e[0], round(e[1], 2)) for m, e in motor.mesas.ocupadas.items()}
+
+def estacao(n, nome, papel, caminho, segundos, mesas, barreira, resultados):
+    random.seed(n)
+    banco = Banco(caminho); motor = MotorVendas(banco, mesas)
+    motor.marcar_sincronia(); motor.catalogo.carregar(motor.listar_produtos()); motor.mesas.carregar(motor.resumo_mesas())
+    pings = {i + 1 for i in range(len(ESTACOES))}; meu_ping = n + 1
+    ids = [pid for pid in motor.catalogo.itens if pid not in pings]
+    atrasos = []; ops = Counter(); recusas = 0; sincronias = 0
+    barreira.wait()
+    fim = time.time() + segundos; proxima_sync = proximo_ping = 0
+    while time.time() < fim:
+        agora = time.time()
+        if agora >= proxima_sync:
+            mudancas = motor.buscar_mudancas()
+            if mudancas:
+                sincronias += 1
+                for l in mudancas.produtos:
+                    if l[0] in pings and l[0] != meu_ping and l[2]: atrasos.append(time.time() - l[2])
+                motor.aplicar_mudancas(mudancas)
+            proxima_sync = agora + SYNC_S
+        if agora >= proximo_ping:
+            motor.aplicar_produtos([banco.atualizar_produto(meu_ping, f"PING {nome}", time.time(), 0, None)])
+            proximo_ping = agora + PING_S
+        try:
+            if papel == 'balcao':
+                carrinho = Carrinho(motor.catalogo)
+                for _ in range(random.randint(1, 4)): carrinho.adicionar(random.choice(ids), random.randint(1, 2))
+                motor.aplicar_produtos(motor.finalizar_avulso(carrinho.itens, "PIX")); ops['finalizar_avulso'] += 1
+            elif random.random() < 0.08:
+                mesa = random.randint(1, mesas)
+                motor.mesas.definir(mesa, motor.fechar_mesa(mesa, "DINHEIRO")); ops['fechar_mesa'] += 1
+            else:
+                mesa, pid, qtd = random.randint(1, mesas), random.choice(ids), random.randint(1, 3)
+                motor.aplicar_lancamento(mesa, [(pid, qtd)], motor.add_item_mesa(mesa, pid, qtd)); ops['add_item_mesa'] += 1
+        except SemEstoque:
+            recusas += 1
+    barreira.wait() # Todos pararam de gravar: a última sincronia tem que deixar tudo igual ao banco
+    mudancas = motor.buscar_mudancas()
+    if mudancas: motor.aplicar_mudancas(mudancas)
+    resultados.put((nome, dict(ops), recusas, sincronias, sorted(atrasos), confere(motor)))
+    banco.fechar()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--segundos", type=float, default=10)
+    ap.add_argument("--produtos", type=int, default=2000)
+    ap.add_argument("--mesas", type=int, default=40)
+    args = ap.parse_args()
+    random.seed(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = os.path.join(tmp, 'terminais.db')
+        preparar(caminho, args.produtos)
+        barreira = mp.Barrier(len(ESTACOES)); resultados = mp.Queue()
+        procs = [mp.Process(target=estacao, args=(n, nome, papel, caminho, args.segundos, args.mesas, barreira, resultados))
+            for n, (nome, papel) in enumerate(ESTACOES)]
+        for p in procs: p.start()
+        res = sorted(resultados.get() for _ in procs)
+        for p in procs: p.join()
+        banco = Banco(caminho)
+        negativos = banco.consultar_um("SELECT COUNT(*) FROM produtos WHERE estoque < 0")[0]
+        mudancas = banco.ultima_mudanca()
+        banco.fechar()
+    falhou = negativos > 0
+    print(f"{len(ESTACOES)} terminais, {args.segundos:.0f}s, {mudancas} mudanças registradas, estoque negativo: {negativos}")
+    print(f"{'TERMINAL':<10} {'OPS/S':>7} {'RECUSAS':>8} {'SYNCS':>6} {'ATRASO P50':>11} {'P99':>8} {'MÁX':>8}  CACHES")
+    for nome, ops, recusas, sincronias, atrasos, ok in res:
+        p50 = percentil(atrasos, 0.50) if atrasos else 0
+        p99 = percentil(atrasos, 0.99) if atrasos else 0
+        maximo = atrasos[-1] if atrasos else float('inf')
+        print(f"{nome:<10} {sum(ops.values()) / args.segundos:>7.0f} {recusas:>8} {sincronias:>6} {p50:>9.0f}ms {p99:>6.0f}ms {maximo * 1000:>6.0f}ms  {'OK' if ok else 'DIFERENTE DO BANCO'}")
+        falhou |= not ok or maximo > LIMITE_S
+    if falhou: raise SystemExit(f"ERRO: caches diferentes do banco ou atraso acima de {LIMITE_S:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# Peças comuns dos benchmarks: catálogo sintético e percentis.
+import random
+
+TIPOS = ["Cerveja", "Chopp", "Caipirinha", "Porção", "Refrigerante", "Água", "Suco", "Espeto", "Pastel", "Drink", "Petisco", "Hambúrguer"]
+SABORES = ["Limão", "Maracujá", "Calabresa", "Frango", "Picanha", "Queijo", "Morango", "Açaí", "Pilsen", "IPA", "Laranja", "Coração"]
+TAMANHOS = ["Lata", "Long Neck", "600ml", "Litro", "Meia", "Inteira", "P", "M", "G", ""]
+
+def gerar_catalogo(banco, n, estoque=(500, 5000), codigos=False, nomes_reais=False):
+    # estoque: quantidade fixa ou faixa (mín, máx) sorteada por produto; códigos 789 + id sequencial
+    def nome(i):
+        if not nomes_reais: return f"Produto {i}"
+        return f"{random.choice(TIPOS)} {random.choice(SABORES)} {random.choice(TAMANHOS)} #{i}".replace("  ", " ")
+    qtd = (lambda: random.randint(*estoque)) if isinstance(estoque, tuple) else (lambda: estoque)
+    with banco.transacao() as c:
+        c.executemany("INSERT INTO produtos (nome,preco,estoque,codigo) VALUES (?,?,?,?)",
+            ((nome(i), round(random.uniform(4, 90), 2), qtd(), f"789{i:010d}" if codigos else None) for i in range(n)))
+
+def percentil(tempos, p):
+    # tempos já ordenados, em segundos; devolve ms
+    return tempos[min(len(tempos) - 1, int(len(tempos) * p))] * 1000
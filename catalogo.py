@@ -0,0 +1,149 @@
+import unicodedata
+from bisect import insort
+from collections import defaultdict
+
+# --- ÍNDICE DE PRODUTOS EM MEMÓRIA ---
+# Fica ao lado do cache de produtos: código de barras -> id por hash, e nomes
+# normalizados (sem acento, minúsculos) indexados por trigramas para a busca
+# por trecho do nome. Os resultados sempre saem na ordem do id.
+
+def normalizar(txt):
+    txt = unicodedata.normalize('NFKD', str(txt or ""))
+    return "".join(ch for ch in txt if not unicodedata.combining(ch)).lower().strip()
+
+def trigramas(txt):
+    return {txt[i:i+3] for i in range(len(txt) - 2)}
+
+class IndiceProdutos:
+    def __init__(self):
+        self.versao = 0
+        self.carregar([])
+
+    def carregar(self, itens):
+        self.versao += 1 # Invalida as buscas incrementais em andamento
+        # itens = [(id, nome, preco, estoque, codigo), ...]
+        self.ordem = sorted(i[0] for i in itens)
+        self.nomes = {}
+        self.codigos = {}
+        self.por_codigo = {}
+        self.por_nome = {} # nome normalizado -> id (pedidos que chegam pelo nome, ex.: cardápio digital)
+        self.por_trigrama = defaultdict(set)
+        for i in itens:
+            self._indexar(i)
+
+    def _indexar(self, item):
+        pid, nome, codigo = item[0], normalizar(item[1]), normalizar(item[4])
+        self.nomes[pid] = nome
+        self.codigos[pid] = codigo
+        if codigo: self.por_codigo[codigo] = pid
+        self.por_nome.setdefault(nome, pid)
+        for t in trigramas(nome): self.por_trigrama[t].add(pid)
+
+    def _desindexar(self, pid):
+        nome = self.nomes.pop(pid)
+        for t in trigramas(nome): self.por_trigrama[t].discard(pid)
+        if self.por_nome.get(nome) == pid: del self.por_nome[nome]
+        codigo = self.codigos.pop(pid)
+        if self.por_codigo.get(codigo) == pid: del self.por_codigo[codigo]
+
+    def atualizar(self, item):
+        pid = item[0]
+        if pid in self.nomes:
+            # Mudança só de preço/estoque não mexe no índice
+            if self.nomes[pid] == normalizar(item[1]) and self.codigos[pid] == normalizar(item[4]): return
+            self._desindexar(pid)
+        else:
+            insort(self.ordem, pid)
+        self._indexar(item)
+        self.versao += 1
+
+    def remover(self, pid):
+        if pid not in self.nomes: return
+        self._desindexar(pid)
+        self.ordem.remove(pid)
+        self.versao += 1
+
+    def por_codigo_barras(self, codigo):
+        return self.por_codigo.get(normalizar(codigo))
+
+    def por_nome_exato(self, nome):
+        return self.por_nome.get(normalizar(nome))
+
+    def candidatos(self, termo):
+        # Termo com 3+ letras: interseção dos trigramas (menor conjunto primeiro)
+        if len(termo) < 3: return self.ordem
+        conjuntos = sorted((self.por_trigrama.get(t, set()) for t in trigramas(termo)), key=len)
+        if not conjuntos[0]: return []
+        return set.intersection(*conjuntos)
+
+    def filtrar(self, termo, dentre=None):
+        termo = normalizar(termo)
+        if not termo: return list(self.ordem)
+        base = self.candidatos(termo) if dentre is None else dentre
+        achados = {pid for pid in base if termo in self.nomes.get(pid, "")}
+        pid_cod = self.por_codigo.get(termo)
+        if pid_cod is not None: achados.add(pid_cod)
+        return sorted(achados)
+
+    def nova_busca(self):
+        return BuscaIncremental(self)
+
+class BuscaIncremental:
+    # Guarda o último termo: se o usuário só acrescentou letras, o novo resultado
+    # é um subconjunto do anterior e basta filtrar o que já tinha sido achado.
+    def __init__(self, indice):
+        self.indice = indice
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.termo = None
+        self.resultado = None
+        self.versao = self.indice.versao
+
+    def filtrar(self, termo):
+        termo = normalizar(termo)
+        if self.versao != self.indice.versao: self.reiniciar()
+        dentre = None
+        if self.termo and self.resultado is not None and self.termo in termo:
+            dentre = self.resultado
+        resultado = self.indice.filtrar(termo, dentre)
+        self.termo, self.resultado = termo, resultado
+        return resultado
+
+# --- ESTADO DOS PRODUTOS ---
+# Dono do cache: recebe as mudanças linha a linha (estoque baixou, preço editado,
+# produto apagado) e avisa os ouvintes, que atualizam só a linha afetada na tela.
+
+class CatalogoProdutos:
+    def __init__(self):
+        self.itens = {} # id -> (id, nome, preco, estoque, codigo)
+        self.indice = IndiceProdutos()
+        self.ouvintes = []
+
+    def ouvir(self, funcao):
+        # funcao(evento, pid, item) com evento em 'carregado', 'inserido', 'alterado', 'removido'
+        self.ouvintes.append(funcao)
+
+    def _avisar(self, evento, pid, item):
+        for funcao in self.ouvintes: funcao(evento, pid, item)
+
+    def carregar(self, itens):
+        self.itens = {i[0]: tuple(i) for i in itens}
+        self.indice.carregar(itens)
+        self._avisar('carregado', None, None)
+
+    def listar(self):
+        return [self.itens[pid] for pid in self.indice.ordem]
+
+    def aplicar(self, item):
+        item = tuple(item); pid = item[0]
+        anterior = self.itens.get(pid)
+        if anterior == item: return
+        self.itens[pid] = item
+        self.indice.atualizar(item)
+        self._avisar('inserido' if anterior is None else 'alterado', pid, item)
+
+    def remover(self, pid):
+        if self.itens.pop(pid, None) is None: return
+        self.indice.remover(pid)
+        self._avisar('removido', pid, None)
@@ -0,0 +1,110 @@
+# --- LISTA VIRTUAL PARA TREEVIEW ---
+# A Treeview só recebe as linhas que cabem na tela (mais uma folga); a barra de
+# rolagem e a roda do mouse movem uma "janela" sobre a fonte de dados, que
+# entrega só a página pedida. Linhas que continuam na janela são reaproveitadas
+# pelo iid em vez de apagadas e inseridas de novo.
+
+from metricas import contar, medir
+
+class FonteLista:
+    # Fonte em memória: 'chaves' é a lista na ordem de exibição; 'buscar' converte
+    # a chave na linha (ex.: id do produto -> tupla do cache). Sem 'buscar', as
+    # próprias chaves já são as linhas.
+    def __init__(self, chaves=(), buscar=None):
+        self.chaves = list(chaves)
+        self.buscar = buscar
+
+    def total(self):
+        return len(self.chaves)
+
+    def pagina(self, inicio, fim):
+        fatia = self.chaves[inicio:fim]
+        if self.buscar is None: return fatia
+        return [l for l in map(self.buscar, fatia) if l is not None]
+
+class ListaVirtual:
+    def __init__(self, tree, scrollbar, chave, valores, tags=None, folga=5, nome="lista"):
+        self.tree = tree
+        self.nome = nome # Rótulo nas métricas (tela.desenhar.<nome>)
+        self.scrollbar = scrollbar
+        self.chave = chave # linha -> iid
+        self.valores = valores # linha -> values
+        self.tags = tags or (lambda linha: ())
+        self.folga = folga
+        self.fonte = FonteLista()
+        self.inicio = 0
+        self.scrollbar.configure(command=self.rolar)
+        self.tree.configure(yscrollcommand='') # A barra é nossa, não da Treeview
+        self.tree.bind("<Configure>", lambda e: self.desenhar())
+        self.tree.bind("<MouseWheel>", self._roda)
+        self.tree.bind("<Button-4>", lambda e: self._mover(-3))
+        self.tree.bind("<Button-5>", lambda e: self._mover(3))
+        self.tree.bind("<Up>", lambda e: self._teclado(-1))
+        self.tree.bind("<Down>", lambda e: self._teclado(1))
+        self.tree.bind("<Prior>", lambda e: self._mover(-self.visiveis()))
+        self.tree.bind("<Next>", lambda e: self._mover(self.visiveis()))
+
+    def definir_fonte(self, fonte, topo=True):
+        self.fonte = fonte
+        if topo: self.inicio = 0
+        self.desenhar()
+
+    def visiveis(self):
+        # Quantas linhas cabem: pela altura real depois de desenhada, senão pelo height configurado
+        altura = self.tree.winfo_height()
+        linha = self.tree.tk.call("ttk::style", "lookup", "Treeview", "-rowheight") or 20
+        if altura > 1: return max(1, (altura - int(linha)) // int(linha)) # Desconta o cabeçalho
+        return max(1, int(self.tree.cget("height")))
+
+    def desenhar(self):
+        with medir(f"tela.desenhar.{self.nome}"): self._desenhar()
+
+    def _desenhar(self):
+        total = self.fonte.total(); n = self.visiveis()
+        self.inicio = max(0, min(self.inicio, total - n))
+        linhas = self.fonte.pagina(self.inicio, min(total, self.inicio + n + self.folga))
+        novos = [str(self.chave(l)) for l in linhas]
+        sair = set(self.tree.get_children()).difference(novos)
+        if sair: self.tree.delete(*sair)
+        for pos, (iid, linha) in enumerate(zip(novos, linhas)):
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=self.valores(linha), tags=self.tags(linha))
+                if self.tree.index(iid) != pos: self.tree.move(iid, '', pos)
+            else:
+                self.tree.insert('', pos, iid=iid, values=self.valores(linha), tags=self.tags(linha))
+        contar("tela.linhas_desenhadas", len(linhas))
+        self.tree.yview_moveto(0)
+        if total: self.scrollbar.set(self.inicio / total, min(1.0, (self.inicio + n) / total))
+        else: self.scrollbar.set(0, 1)
+
+    def atualizar_linha(self, linha):
+        # Mudança numa linha só: se ela está na janela, corrige só ela
+        iid = str(self.chave(linha))
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=self.valores(linha), tags=self.tags(linha)); contar("tela.linhas_desenhadas")
+
+    def rolar(self, *args):
+        # Chamado pela Scrollbar: ('moveto', fração) ou ('scroll', n, 'units'|'pages')
+        if args[0] == 'moveto': self.inicio = int(float(args[1]) * self.fonte.total())
+        elif args[0] == 'scroll': self.inicio += int(args[1]) * (self.visiveis() if args[2] == 'pages' else 1)
+        self.desenhar()
+
+    def _mover(self, linhas):
+        self.inicio += linhas; self.desenhar()
+        return "break"
+
+    def _roda(self, event):
+        return self._mover(-3 if event.delta > 0 else 3)
+
+    def _teclado(self, passo):
+        # Setas no limite da janela: rola uma linha e leva a seleção junto
+        foco = self.tree.focus(); filhos = self.tree.get_children()
+        if not foco or foco not in filhos: return None
+        pos = filhos.index(foco) + passo
+        if 0 <= pos < min(len(filhos), self.visiveis()): return None # Dentro da janela: deixa a Treeview cuidar
+        self._mover(passo)
+        filhos = self.tree.get_children()
+        if filhos:
+            alvo = filhos[max(0, min(pos - passo if passo > 0 else 0, len(filhos) - 1))]
+            self.tree.selection_set(alvo); self.tree.focus(alvo)
+        return "break"
@@ -0,0 +1,48 @@
+# --- ESTADO DAS MESAS EM MEMÓRIA ---
+# Itens, total e hora de abertura de cada mesa ocupada. Lido do banco uma vez
+# na abertura do sistema (Banco.resumo_mesas); depois cada lançamento e cada
+# fechamento corrige só a mesa afetada e avisa os ouvintes, que repintam só
+# aquele botão. Igual ao CatalogoProdutos: quem altera é a thread da tela.
+
+class MapaMesas:
+    def __init__(self, total=20):
+        self.total = total # Mesas numeradas de 1 a total
+        self.ocupadas = {} # mesa -> (itens, total, aberta_em)
+        self.ouvintes = []
+
+    def ouvir(self, funcao):
+        # funcao(evento, mesa, estado) com evento em 'carregado', 'aberta', 'alterada', 'fechada'
+        self.ouvintes.append(funcao)
+
+    def _avisar(self, evento, mesa, estado):
+        for funcao in self.ouvintes: funcao(evento, mesa, estado)
+
+    def valida(self, mesa):
+        return isinstance(mesa, int) and 1 <= mesa <= self.total
+
+    def estado(self, mesa):
+        return self.ocupadas.get(mesa) # None = livre
+
+    def carregar(self, linhas):
+        # linhas = [(mesa, itens, total, aberta_em), ...] das vendas ABERTA
+        self.ocupadas = {l[0]: (l[1], l[2], l[3]) for l in linhas}
+        self._avisar('carregado', None, None)
+
+    def lancar(self, mesa, itens, total, dt):
+        anterior = self.ocupadas.get(mesa)
+        if anterior is None: estado = (itens, total, dt)
+        else: estado = (anterior[0] + itens, anterior[1] + total, min(anterior[2], dt))
+        self.ocupadas[mesa] = estado
+        self._avisar('aberta' if anterior is None else 'alterada', mesa, estado)
+
+    def definir(self, mesa, estado):
+        # Estado lido do banco (ex.: outro terminal mexeu na mesa); None = livre
+        if estado is None: return self.fechar(mesa)
+        anterior = self.ocupadas.get(mesa)
+        if anterior == estado: return
+        self.ocupadas[mesa] = estado
+        self._avisar('aberta' if anterior is None else 'alterada', mesa, estado)
+
+    def fechar(self, mesa):
+        if self.ocupadas.pop(mesa, None) is None: return
+        self._avisar('fechada', mesa, None)
@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# --- MÉTRICAS DE DESEMPENHO ---
+# Tempo de cada operação (banco e tela) numa janela móvel das últimas N
+# medições, com percentis e histograma, mais contadores (linhas lidas do banco,
+# linhas redesenhadas nas Treeviews). Tudo em memória e barato de registrar;
+# a aba DIAGNÓSTICO mostra o resumo e um registrador grava o mesmo resumo,
+# de tempos em tempos, num log que roda sozinho (RotatingFileHandler).
+#
+# Pode ser chamado de qualquer thread.
+
+JANELA = 1000 # Medições guardadas por operação
+LIMITES_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000) # Faixas do histograma (a última pega o resto)
+LENTO_MS = 250 # Acima disso a operação vai para o log na hora
+ARQUIVO_LOG = "bancart_metricas.log"
+
+log = logging.getLogger("bancart")
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] if ordenados else 0.0
+
+class Metricas:
+    def __init__(self, janela=JANELA, lento_ms=LENTO_MS):
+        self.janela = janela
+        self.lento_ms = lento_ms
+        self.lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self.lock:
+            self.tempos = {} # nome -> deque de ms
+            self.totais = {} # nome -> quantas vezes rodou desde o início
+            self.contadores = {} # nome -> soma
+
+    def registrar(self, nome, ms):
+        with self.lock:
+            if nome not in self.tempos: self.tempos[nome] = deque(maxlen=self.janela); self.totais[nome] = 0
+            self.tempos[nome].append(ms); self.totais[nome] += 1
+        if ms >= self.lento_ms: log.warning("Lento: %s levou %.0f ms", nome, ms)
+
+    def contar(self, nome, n=1):
+        with self.lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + n
+
+    @contextmanager
+    def medir(self, nome):
+        t = time.perf_counter()
+        try: yield
+        finally: self.registrar(nome, (time.perf_counter() - t) * 1000)
+
+    def resumo(self):
+        # [(nome, total, p50, p95, p99, máx, histograma), ...] da operação mais lenta (p99) para a mais rápida
+        with self.lock:
+            copias = {nome: (sorted(ts), self.totais[nome]) for nome, ts in self.tempos.items()}
+        linhas = []
+        for nome, (ts, total) in copias.items():
+            hist = [0] * (len(LIMITES_MS) + 1); i = 0
+            for ms in ts: # ts já está ordenado: anda pelas faixas uma vez só
+                while i < len(LIMITES_MS) and ms > LIMITES_MS[i]: i += 1
+                hist[i] += 1
+            linhas.append((nome, total, percentil(ts, 0.50), percentil(ts, 0.95), percentil(ts, 0.99), ts[-1] if ts else 0.0, hist))
+        return sorted(linhas, key=lambda l: l[4], reverse=True)
+
+    def contadores_atuais(self):
+        with self.lock:
+            return dict(self.contadores)
+
+# Instância do programa inteiro: banco, tela e servidor registram aqui
+METRICAS = Metricas()
+medir = METRICAS.medir
+contar = METRICAS.contar
+
+def texto_histograma(hist):
+    # Uma barrinha por faixa de LIMITES_MS, proporcional à mais cheia
+    blocos = " ▁▂▃▄▅▆▇█"
+    maior = max(hist) or 1
+    return "".join(blocos[0 if not n else max(1, round(n * (len(blocos) - 1) / maior))] for n in hist)
+
+def configurar_log(arquivo=ARQUIVO_LOG, max_bytes=1024 * 1024, copias=5):
+    # Log do "bancart" (erros + métricas) em arquivo que gira ao passar de max_bytes
+    manipulador = RotatingFileHandler(arquivo, maxBytes=max_bytes, backupCount=copias, encoding='utf-8')
+    manipulador.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log.addHandler(manipulador); log.setLevel(logging.INFO)
+    return manipulador
+
+class RegistradorMetricas:
+    # Grava o resumo no log a cada 'intervalo_s', numa thread própria
+    def __init__(self, metricas=METRICAS, intervalo_s=60):
+        self.metricas = metricas
+        self.intervalo_s = intervalo_s
+        self.parar_evento = threading.Event()
+        self.thread = threading.Thread(target=self._rodar, name="bancart-metricas", daemon=True)
+
+    def iniciar(self):
+        self.thread.start()
+
+    def parar(self):
+        self.parar_evento.set()
+        self.gravar() # Última fotografia ao fechar o sistema
+
+    def gravar(self):
+        for nome, total, p50, p95, p99, maximo, hist in self.metricas.resumo():
+            log.info("%s n=%d p50=%.1fms p95=%.1fms p99=%.1fms max=%.1fms hist=%s", nome, total, p50, p95, p99, maximo, hist)
+        contadores = self.metricas.contadores_atuais()
+        if contadores: log.info("contadores %s", " ".join(f"{k}={v}" for k, v in sorted(contadores.items())))
+
+    def _rodar(self):
+        while not self.parar_evento.wait(self.intervalo_s):
+            self.gravar()
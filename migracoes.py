@@ -0,0 +1,122 @@
+import argparse
+import logging
+import os
+
+log = logging.getLogger("bancart")
+
+# --- MIGRAÇÕES DO BANCO ---
+# A versão do esquema fica em PRAGMA user_version. Cada migração roda uma única
+# vez, em ordem, dentro da mesma transação que grava a nova versão.
+#
+# Migração que apagaria dado do dono (ex.: código de barras repetido) não
+# decide sozinha: para com ErroMigracao explicando o que achou. Para aceitar a
+# limpeza: python migracoes.py --limpar-codigos-repetidos
+
+LIMPAR_CODIGOS_REPETIDOS = False # m003: True = mantém o código só no produto mais antigo (ligado pela linha de comando)
+
+class ErroMigracao(Exception):
+    pass
+
+def m001_tabelas(c):
+    c.execute("""CREATE TABLE IF NOT EXISTS produtos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT, preco REAL, estoque INTEGER, codigo TEXT
+    )""")
+    c.execute("""CREATE TABLE IF NOT EXISTS vendas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        mesa_id INTEGER,
+        produto_nome TEXT, qtd INTEGER, total REAL,
+        data_hora TEXT, pagamento TEXT, status TEXT
+    )""")
+
+def m002_coluna_codigo(c):
+    # Bancos antigos não tinham a coluna 'codigo'
+    colunas = [x[1] for x in c.execute("PRAGMA table_info(produtos)")]
+    if 'codigo' not in colunas:
+        c.execute("ALTER TABLE produtos ADD COLUMN codigo TEXT")
+        log.info("Coluna 'codigo' adicionada em produtos")
+
+def m003_limpar_codigos(c):
+    # Prepara o índice único: código vazio vira NULL. Repetidos param a migração,
+    # a não ser que o dono tenha pedido para deixá-los só no primeiro produto
+    c.execute("UPDATE produtos SET codigo=NULLIF(TRIM(codigo), '')")
+    repetidos = c.execute("""SELECT id, codigo FROM produtos p WHERE codigo IS NOT NULL
+        AND EXISTS (SELECT 1 FROM produtos o WHERE o.codigo=p.codigo AND o.id<p.id)""").fetchall()
+    if not repetidos: return
+    if not LIMPAR_CODIGOS_REPETIDOS:
+        for pid, codigo in repetidos: log.warning("Código %s repetido no produto %d", codigo, pid)
+        lista = ", ".join(f"{codigo} (produto {pid})" for pid, codigo in repetidos)
+        raise ErroMigracao(f"Códigos de barras repetidos: {lista}. Para manter cada código só no produto mais antigo "
+            "(os outros ficam sem código), rode: python migracoes.py --limpar-codigos-repetidos")
+    for pid, codigo in repetidos:
+        c.execute("UPDATE produtos SET codigo=NULL WHERE id=?", (pid,))
+        log.warning("Código %s repetido: removido do produto %d", codigo, pid)
+
+def m004_indices(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_vendas_status_mesa ON vendas (status, mesa_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_vendas_status_data ON vendas (status, data_hora)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_produtos_codigo ON produtos (codigo)")
+
+def m005_resumo_vendas(c):
+    # Totais por dia/pagamento/produto, mantidos junto com cada venda fechada
+    c.execute("""CREATE TABLE IF NOT EXISTS resumo_vendas (
+        dia TEXT, pagamento TEXT, produto_nome TEXT, qtd INTEGER, total REAL,
+        PRIMARY KEY (dia, pagamento, produto_nome)
+    ) WITHOUT ROWID""")
+    c.execute("""INSERT INTO resumo_vendas (dia, pagamento, produto_nome, qtd, total)
+        SELECT substr(data_hora, 1, 10), COALESCE(pagamento, ''), produto_nome, SUM(qtd), SUM(total)
+        FROM vendas WHERE status='FECHADA' GROUP BY 1, 2, 3""")
+
+def m006_mudancas(c):
+    # Registro de alterações para os outros terminais: cada escrita em produtos/vendas
+    # deixa uma linha (tipo, chave) via trigger, seja qual for o programa que gravou.
+    # tipo: 'produto' (chave = id), 'mesa' (item lançado; chave = mesa),
+    # 'fechada' (mesa fechada; chave = mesa), 'caixa' (venda de balcão; chave = id da venda)
+    c.execute("""CREATE TABLE IF NOT EXISTS mudancas (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, chave INTEGER
+    )""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS trg_produtos_ins AFTER INSERT ON produtos
+        BEGIN INSERT INTO mudancas (tipo, chave) VALUES ('produto', NEW.id); END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS trg_produtos_upd AFTER UPDATE ON produtos
+        BEGIN INSERT INTO mudancas (tipo, chave) VALUES ('produto', NEW.id); END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS trg_produtos_del AFTER DELETE ON produtos
+        BEGIN INSERT INTO mudancas (tipo, chave) VALUES ('produto', OLD.id); END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS trg_vendas_ins AFTER INSERT ON vendas
+        BEGIN INSERT INTO mudancas (tipo, chave) VALUES (CASE WHEN NEW.status='ABERTA' THEN 'mesa' ELSE 'caixa' END,
+            CASE WHEN NEW.status='ABERTA' THEN NEW.mesa_id ELSE NEW.id END); END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS trg_vendas_fechar AFTER UPDATE OF status ON vendas
+        WHEN OLD.status='ABERTA' AND NEW.status='FECHADA'
+        BEGIN INSERT INTO mudancas (tipo, chave) VALUES ('fechada', NEW.mesa_id); END""")
+
+MIGRACOES = [m001_tabelas, m002_coluna_codigo, m003_limpar_codigos, m004_indices, m005_resumo_vendas, m006_mudancas]
+
+def versao_atual(banco):
+    return banco.consultar_um("PRAGMA user_version")[0]
+
+def migrar(banco, ate=None):
+    ate = len(MIGRACOES) if ate is None else ate
+    for versao in range(versao_atual(banco) + 1, ate + 1):
+        with banco.transacao() as c:
+            if c.execute("PRAGMA user_version").fetchone()[0] >= versao: continue # Outro terminal migrou enquanto esperávamos o lock
+            MIGRACOES[versao - 1](c)
+            c.execute(f"PRAGMA user_version={versao}")
+    return versao_atual(banco)
+
+def main():
+    global LIMPAR_CODIGOS_REPETIDOS
+    from banco import Banco
+    from metricas import configurar_log
+    ap = argparse.ArgumentParser(description="Atualiza o esquema do banco do BANCART")
+    ap.add_argument("--banco", default=os.environ.get("BANCART_DB", "bancart_dados.db"))
+    ap.add_argument("--limpar-codigos-repetidos", action="store_true", help="código de barras repetido fica só no produto mais antigo")
+    args = ap.parse_args()
+    if not os.path.isfile(args.banco): raise SystemExit(f"Banco não encontrado: {args.banco}")
+    configurar_log() # O que a migração mexeu fica registrado
+    LIMPAR_CODIGOS_REPETIDOS = args.limpar_codigos_repetidos
+    banco = Banco(args.banco)
+    try: print(f"Esquema na versão {migrar(banco)}")
+    except ErroMigracao as e: raise SystemExit(f"Migração parada: {e}")
+    finally: banco.fechar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+from datetime import datetime
+
+from banco import SemEstoque
+from catalogo import CatalogoProdutos
+from mapa_mesas import MapaMesas
+from sincronia import ObservadorMudancas
+
+# --- NÚCLEO DE VENDAS (SEM TELA) ---
+# Regras de estoque, mesas, balcão e caixa, sem nenhum widget: a interface Tk,
+# os scripts de linha de comando e os benchmarks chamam as mesmas funções.
+#
+# Os métodos do MotorVendas que vão ao banco podem rodar em qualquer thread.
+# O catálogo (motor.catalogo) e o mapa de mesas (motor.mesas) avisam os
+# ouvintes na thread de quem chama aplicar_*()/carregar(): na interface isso é
+# sempre a thread do Tk.
+
+class ErroEntrada(ValueError):
+    pass
+
+def agora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def hoje():
+    return datetime.now().strftime("%Y-%m-%d")
+
+# --- LEITURA DOS CAMPOS (texto digitado -> valores) ---
+def ler_produto(txt):
+    # Combobox mostra "id - nome | R$ preço"
+    try: return int(str(txt).split(' - ')[0])
+    except ValueError: raise ErroEntrada("Escolha um produto") from None
+
+def ler_quantidade(txt):
+    try: qtd = int(txt)
+    except ValueError: raise ErroEntrada("Quantidade inválida") from None
+    if qtd <= 0: raise ErroEntrada("Quantidade inválida")
+    return qtd
+
+def ler_dados_produto(nome, preco, estoque, codigo):
+    # Devolve (nome, preco, estoque, codigo) prontos para gravar
+    nome = nome.strip()
+    if not nome: raise ErroEntrada("Informe o nome")
+    try: preco = float(str(preco).replace(',', '.')); estoque = int(estoque)
+    except ValueError: raise ErroEntrada("Dados inválidos") from None
+    return nome, preco, estoque, (codigo or "").strip() or None # Código vazio = sem código
+
+def total_itens(itens, col=3):
+    return sum(i[col] for i in itens)
+
+class Carrinho:
+    # Carrinho do balcão: confere o estoque no cache antes de aceitar o item
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self.itens = [] # [{'id', 'nome', 'qtd', 'tot'}, ...]
+
+    def adicionar(self, pid, qtd):
+        prod = self.catalogo.itens.get(pid) # (id, nome, preco, estoque, codigo)
+        if prod is None: raise ErroEntrada("Produto não encontrado")
+        ja = sum(i['qtd'] for i in self.itens if i['id'] == pid)
+        if prod[3] < ja + qtd: raise SemEstoque([(pid, prod[1], ja + qtd, prod[3])])
+        item = {'id': pid, 'nome': prod[1], 'qtd': qtd, 'tot': prod[2] * qtd}
+        self.itens.append(item)
+        return item
+
+    def limpar(self):
+        self.itens = []
+
+    def total(self):
+        return sum(i['tot'] for i in self.itens)
+
+class MotorVendas:
+    def __init__(self, banco, mesas=20):
+        self.db = banco
+        self.catalogo = CatalogoProdutos()
+        self.mesas = MapaMesas(mesas)
+        self.observador = ObservadorMudancas(banco)
+
+    # --- PRODUTOS ---
+    def listar_produtos(self):
+        return self.db.listar_produtos()
+
+    def buscar(self, termo):
+        return self.catalogo.indice.filtrar(termo)
+
+    def salvar_produto(self, nome, preco, estoque, codigo):
+        return self.db.inserir_produto(*ler_dados_produto(nome, preco, estoque, codigo))
+
+    def atualizar_produto(self, pid, nome, preco, estoque, codigo):
+        return self.db.atualizar_produto(pid, *ler_dados_produto(nome, preco, estoque, codigo))
+
+    def excluir_produto(self, pid):
+        self.db.excluir_produto(pid)
+
+    def aplicar_produtos(self, linhas):
+        for linha in linhas: self.catalogo.aplicar(linha)
+
+    # --- MESAS ---
+    def add_item_mesa(self, mesa, pid, qtd, dt=None):
+        # Devolve as linhas de produto alteradas (estoque já baixado)
+        if not mesa: raise ErroEntrada("Selecione uma mesa")
+        if not self.mesas.valida(mesa): raise ErroEntrada("Mesa inválida")
+        return self.db.lancar_item_mesa(mesa, pid, qtd, dt or agora())
+
+    def aplicar_lancamentos(self, lancados, linhas, dt=None):
+        # Depois de gravado: lancados = [(mesa, [(id, qtd), ...]), ...]; linhas = produtos como ficaram
+        precos = {l[0]: l[2] for l in linhas}
+        self.aplicar_produtos(linhas); dt = dt or agora()
+        for mesa, itens in lancados:
+            self.mesas.lancar(mesa, sum(q for _, q in itens), sum(precos[pid] * q for pid, q in itens), dt)
+
+    def aplicar_lancamento(self, mesa, itens, linhas, dt=None):
+        self.aplicar_lancamentos([(mesa, itens)], linhas, dt)
+
+    def lancar_pedidos(self, pedidos, dt=None):
+        # pedidos = [(mesa, [(id, qtd), ...]), ...] já conferidos; ver Banco.lancar_pedidos_mesa
+        return self.db.lancar_pedidos_mesa(pedidos, dt or agora())
+
+    def itens_mesa(self, mesa):
+        return self.db.itens_mesa(mesa)
+
+    def resumo_mesas(self):
+        return self.db.resumo_mesas()
+
+    def fechar_mesa(self, mesa, pagamento, ao_gravar=None):
+        # Devolve o estado da mesa lido logo após o COMMIT (None = livre), para o mapa usar definir() e
+        # não um fechar() às cegas. ao_gravar(mesa, estado) roda com o banco ainda travado, como no
+        # servidor de pedidos: um lote gravado depois do fechamento chega à tela depois dele
+        with self.db.lock:
+            self.db.fechar_mesa(mesa, pagamento)
+            linhas = self.db.resumo_mesas([mesa])
+            estado = (linhas[0][1], linhas[0][2], linhas[0][3]) if linhas else None
+            if ao_gravar: ao_gravar(mesa, estado)
+        return estado
+
+    # --- OUTROS TERMINAIS ---
+    def marcar_sincronia(self):
+        self.observador.marcar()
+
+    def buscar_mudancas(self):
+        return self.observador.verificar()
+
+    def aplicar_mudancas(self, mudancas):
+        # Na thread dona dos caches; os ouvintes do catálogo e do mapa repintam só o que mudou
+        if mudancas.completo:
+            self.catalogo.carregar(mudancas.produtos)
+            self.mesas.carregar([(m,) + e for m, e in mudancas.mesas.items()])
+            return
+        self.aplicar_produtos(mudancas.produtos)
+        for pid in mudancas.removidos: self.catalogo.remover(pid)
+        for mesa, estado in mudancas.mesas.items(): self.mesas.definir(mesa, estado)
+
+    # --- BALCÃO ---
+    def finalizar_avulso(self, itens, pagamento, dt=None):
+        if not itens: raise ErroEntrada("Carrinho vazio")
+        return self.db.registrar_venda_avulsa(itens, pagamento, dt or agora())
+
+    # --- CAIXA ---
+    def historico(self, dia=None):
+        # (vendas do dia, total do dia); o total vem da tabela de resumo, sem somar linha a linha
+        dia = dia or hoje()
+        return self.db.vendas_do_dia(dia), self.db.total_do_dia(dia)
@@ -0,0 +1,159 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import date, timedelta
+
+from banco import Banco, intervalo_dia
+
+# --- RELATÓRIOS DE VENDAS ---
+# As vendas saem do banco em páginas e vão direto para o arquivo: a memória
+# usada não depende do tamanho do período. Os subtotais por dia e por forma de
+# pagamento são somados enquanto as linhas passam.
+#
+# Cada página é uma consulta nova, continuando de onde a anterior parou
+# (data_hora, id). Um cursor aberto o relatório inteiro seguraria o lock de
+# leitura o tempo todo: em journal DELETE, nenhum terminal conseguiria gravar
+# uma venda enquanto o relatório do mês roda.
+
+FORMATOS = ('txt', 'csv', 'jsonl')
+ORIGENS = ('mesa', 'balcao')
+PAGINA = 500 # Vendas por consulta
+
+def consultar_vendas(banco, inicio, fim, pagamento=None, origem=None, produto=None, pagina=PAGINA):
+    # Gerador de (data_hora, mesa_id, produto_nome, qtd, total, pagamento), uma página por consulta
+    sql = "SELECT data_hora, mesa_id, produto_nome, qtd, total, pagamento, id FROM vendas WHERE status='FECHADA' AND data_hora >= ? AND data_hora < ?"
+    params = list(intervalo_dia(inicio, fim))
+    if pagamento: sql += " AND pagamento = ?"; params.append(pagamento)
+    if origem == 'mesa': sql += " AND mesa_id > 0"
+    elif origem == 'balcao': sql += " AND mesa_id = 0"
+    if produto: sql += " AND produto_nome = ?"; params.append(produto)
+    primeira = sql + " ORDER BY data_hora, id LIMIT ?"
+    seguintes = sql + " AND (data_hora, id) > (?, ?) ORDER BY data_hora, id LIMIT ?"
+    linhas = banco.consultar(primeira, params + [pagina])
+    while True:
+        for v in linhas: yield v[:6]
+        if len(linhas) < pagina: return
+        ultima = linhas[-1] # O início do período anda junto: a busca no índice começa nesta página, não no dia 1
+        linhas = banco.consultar(seguintes, [ultima[0]] + params[1:] + [ultima[0], ultima[6], pagina])
+
+def nome_origem(mesa):
+    return f"Mesa {mesa}" if mesa > 0 else "Balcão"
+
+# Cada escritor recebe os mesmos eventos: inicio, venda, subtotal_dia, fim
+class EscritorTxt:
+    def __init__(self, f): self.f = f
+    def inicio(self, titulo):
+        self.f.write(f"=== RELATORIO DE VENDAS: {titulo} ===\n\n")
+        self.f.write(f"{'HORA':<10} {'ORIGEM':<10} {'PRODUTO':<20} {'QTD':<5} {'TOTAL':<10} {'PAGAMENTO'}\n")
+        self.f.write("-" * 80 + "\n")
+    def novo_dia(self, dia):
+        self.f.write(f"\n[{dia}]\n")
+    def venda(self, v):
+        self.f.write(f"{v[0].split(' ')[1]:<10} {nome_origem(v[1]):<10} {v[2][:20]:<20} {v[3]:<5} R${v[4]:<8.2f} {v[5]}\n")
+    def subtotal_dia(self, dia, qtd, total):
+        self.f.write(f"{'':<10} {'SUBTOTAL ' + dia:<31} {qtd:<5} R${total:<8.2f}\n")
+    def fim(self, por_pagamento, qtd, total):
+        self.f.write("-" * 80 + "\n")
+        for pag, tot in sorted(por_pagamento.items()): self.f.write(f"{pag:<14} R$ {tot:.2f}\n")
+        self.f.write(f"TOTAL DO PERÍODO: R$ {total:.2f} ({qtd} itens)\n")
+        self.f.write("=" * 80)
+
+class EscritorCsv:
+    # Coluna 'tipo' separa as vendas das linhas de subtotal/total
+    def __init__(self, f): self.w = csv.writer(f, delimiter=';')
+    def inicio(self, titulo): self.w.writerow(['tipo', 'data_hora', 'origem', 'produto', 'qtd', 'total', 'pagamento'])
+    def novo_dia(self, dia): pass
+    def venda(self, v): self.w.writerow(['venda', v[0], nome_origem(v[1]), v[2], v[3], f"{v[4]:.2f}", v[5]])
+    def subtotal_dia(self, dia, qtd, total): self.w.writerow(['subtotal_dia', dia, '', '', qtd, f"{total:.2f}", ''])
+    def fim(self, por_pagamento, qtd, total):
+        for pag, tot in sorted(por_pagamento.items()): self.w.writerow(['total_pagamento', '', '', '', '', f"{tot:.2f}", pag])
+        self.w.writerow(['total', '', '', '', qtd, f"{total:.2f}", ''])
+
+class EscritorJsonl:
+    def __init__(self, f): self.f = f
+    def _gravar(self, obj): self.f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    def inicio(self, titulo): pass
+    def novo_dia(self, dia): pass
+    def venda(self, v): self._gravar({'tipo': 'venda', 'data_hora': v[0], 'mesa': v[1], 'produto': v[2], 'qtd': v[3], 'total': round(v[4], 2), 'pagamento': v[5]})
+    def subtotal_dia(self, dia, qtd, total): self._gravar({'tipo': 'subtotal_dia', 'dia': dia, 'qtd': qtd, 'total': round(total, 2)})
+    def fim(self, por_pagamento, qtd, total):
+        for pag, tot in sorted(por_pagamento.items()): self._gravar({'tipo': 'total_pagamento', 'pagamento': pag, 'total': round(tot, 2)})
+        self._gravar({'tipo': 'total', 'qtd': qtd, 'total': round(total, 2)})
+
+ESCRITORES = {'txt': EscritorTxt, 'csv': EscritorCsv, 'jsonl': EscritorJsonl}
+
+def exportar(banco, f, formato, inicio, fim, **filtros):
+    # Devolve quantas vendas foram escritas
+    esc = ESCRITORES[formato](f)
+    esc.inicio(inicio if inicio == fim else f"{inicio} a {fim}")
+    dia_atual = None; qtd_dia = tot_dia = 0
+    qtd = total = vendas = 0; por_pagamento = {}
+    with closing(consultar_vendas(banco, inicio, fim, **filtros)) as linhas:
+        for v in linhas:
+            dia = v[0][:10]
+            if dia != dia_atual:
+                if dia_atual: esc.subtotal_dia(dia_atual, qtd_dia, tot_dia)
+                dia_atual, qtd_dia, tot_dia = dia, 0, 0
+                esc.novo_dia(dia)
+            esc.venda(v)
+            vendas += 1; qtd_dia += v[3]; tot_dia += v[4]; qtd += v[3]; total += v[4]
+            pag = v[5] or ""; por_pagamento[pag] = por_pagamento.get(pag, 0) + v[4]
+    if dia_atual: esc.subtotal_dia(dia_atual, qtd_dia, tot_dia)
+    esc.fim(por_pagamento, qtd, total)
+    return vendas
+
+def exportar_arquivo(banco, saida, formato, inicio, fim, vazio=True, **filtros):
+    # Escreve num .parcial e só dá o nome final quando a exportação inteira deu certo: falha no meio
+    # não deixa relatório cortado com cara de completo. vazio=False: sem vendas, não deixa arquivo
+    parcial = saida + ".parcial"
+    try:
+        with open(parcial, "w", encoding='utf-8', newline='' if formato == 'csv' else None) as f:
+            vendas = exportar(banco, f, formato, inicio, fim, **filtros)
+        if vendas or vazio: os.replace(parcial, saida)
+    finally:
+        if os.path.exists(parcial): os.remove(parcial)
+    return vendas
+
+def data_iso(texto):
+    # type= do argparse: data inválida vira mensagem de uso, não traceback
+    try: return date.fromisoformat(texto).isoformat()
+    except ValueError: raise argparse.ArgumentTypeError(f"data inválida: {texto!r} (use YYYY-MM-DD)") from None
+
+def mes_anterior(hoje=None):
+    primeiro = (hoje or date.today()).replace(day=1)
+    ultimo = primeiro - timedelta(days=1)
+    return ultimo.replace(day=1).isoformat(), ultimo.isoformat()
+
+def main():
+    # Exemplo (cron, todo dia 1): python relatorios.py --mes-anterior --formato csv
+    ap = argparse.ArgumentParser(description="Exporta as vendas fechadas do BANCART")
+    ap.add_argument("--banco", default=os.environ.get("BANCART_DB", "bancart_dados.db"))
+    ap.add_argument("--inicio", type=data_iso, help="YYYY-MM-DD (padrão: hoje)")
+    ap.add_argument("--fim", type=data_iso, help="YYYY-MM-DD, inclusivo (padrão: igual ao início)")
+    ap.add_argument("--mes-anterior", action="store_true", help="período = mês passado inteiro")
+    ap.add_argument("--formato", choices=FORMATOS, default='txt')
+    ap.add_argument("--pagamento")
+    ap.add_argument("--origem", choices=ORIGENS)
+    ap.add_argument("--produto")
+    ap.add_argument("--saida", help="arquivo de saída ('-' = tela). Padrão: Relatorio_<período>.<formato>")
+    args = ap.parse_args()
+    if args.mes_anterior: inicio, fim = mes_anterior()
+    else: inicio = args.inicio or date.today().isoformat(); fim = args.fim or inicio
+    if fim < inicio: ap.error(f"--fim ({fim}) antes de --inicio ({inicio})")
+    saida = args.saida or (f"Relatorio_{inicio}.{args.formato}" if inicio == fim else f"Relatorio_{inicio}_{fim}.{args.formato}")
+    filtros = dict(pagamento=args.pagamento, origem=args.origem, produto=args.produto)
+    try: banco = Banco(args.banco, somente_leitura=True) # Caminho errado (ex.: cron rodando de outra pasta) não cria banco vazio
+    except (OSError, sqlite3.Error) as e: raise SystemExit(f"Erro ao abrir o banco: {e}")
+    try:
+        if saida == '-': vendas = exportar(banco, sys.stdout, args.formato, inicio, fim, **filtros)
+        else: vendas = exportar_arquivo(banco, saida, args.formato, inicio, fim, **filtros)
+    except sqlite3.Error as e: raise SystemExit(f"Erro ao ler o banco {args.banco}: {e}")
+    finally: banco.fechar()
+    print(f"{vendas} vendas exportadas" + ("" if saida == '-' else f" para {saida}"), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
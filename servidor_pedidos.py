@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from banco import Banco, SemEstoque
+from metricas import contar, medir
+from nucleo import ErroEntrada, MotorVendas
+
+log = logging.getLogger("bancart")
+
+# --- SERVIDOR DE PEDIDOS (CARDÁPIO DIGITAL -> MESA) ---
+# HTTP/JSON bem simples em asyncio, numa thread própria ao lado da tela. O
+# cliente manda o carrinho (POST /pedido) e o pedido é conferido no cache de
+# produtos sem ir ao banco; os aceitos entram numa fila e um único gravador
+# junta o que chegou nos últimos milissegundos numa transação só (um COMMIT
+# para a casa cheia pedindo ao mesmo tempo). A gravação roda num executor,
+# fora do loop, então o loop continua recebendo enquanto o banco grava.
+#
+# Exemplo de pedido:
+#   {"mesa": 7, "itens": [{"nome": "Brahma Litrão", "qtd": 2}, {"id": 12, "qtd": 1}]}
+
+PORTA = 8765
+LOTE_MS = 20 # Quanto o gravador espera por mais pedidos antes de gravar
+MAX_LOTE = 200 # Pedidos por transação
+MAX_FILA = 2000 # Acima disso responde 503 em vez de acumular
+MAX_CORPO = 64 * 1024
+MAX_ITENS = 50
+MAX_QTD = 99
+TEMPO_LEITURA = 10 # Segundos para o cliente mandar a requisição inteira
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+ARQUIVOS = {'/': 'index.html', '/index.html': 'index.html', '/logo.png': 'logo.png', '/image_1.png': 'image_1.png'}
+TIPOS = {'.html': 'text/html; charset=utf-8', '.png': 'image/png'}
+MOTIVOS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    408: 'Request Timeout', 409: 'Conflict', 413: 'Payload Too Large', 415: 'Unsupported Media Type', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class ErroHttp(Exception):
+    def __init__(self, status, msg):
+        self.status = status
+        super().__init__(msg)
+
+class Pedido:
+    def __init__(self, mesa, itens, futuro):
+        self.mesa = mesa
+        self.itens = itens # [(id, qtd), ...]
+        self.futuro = futuro
+
+class ServidorPedidos:
+    def __init__(self, motor, host="0.0.0.0", porta=PORTA, ao_gravar=None, lote_ms=LOTE_MS, max_lote=MAX_LOTE):
+        self.motor = motor
+        self.catalogo = motor.catalogo # Só leitura daqui: get() num dict é seguro entre threads
+        self.host, self.porta = host, porta
+        self.ao_gravar = ao_gravar # ao_gravar(lancados, linhas) a cada lote gravado; chamado no executor, com o banco ainda travado (ver _gravar_lote)
+        self.lote_ms, self.max_lote = lote_ms, max_lote
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bancart-pedidos")
+        self.estaticos = {}
+        self.erro = None
+        self.loop = None
+        self.pronto = threading.Event()
+        self.thread = threading.Thread(target=self._rodar, name="bancart-servidor", daemon=True)
+
+    # --- CICLO DE VIDA ---
+    def iniciar(self, espera_s=5):
+        # Devolve False se não conseguiu abrir a porta (o caixa segue funcionando sem o cardápio)
+        self.thread.start()
+        self.pronto.wait(espera_s)
+        if self.erro: log.error("Servidor de pedidos desligado: %s", self.erro)
+        return self.erro is None and self.pronto.is_set()
+
+    def parar(self, espera_s=5):
+        if self.loop and not self.loop.is_closed():
+            try: self.loop.call_soon_threadsafe(self.parar_evento.set)
+            except RuntimeError: pass # Loop já encerrado
+        self.thread.join(espera_s)
+        self.executor.shutdown(wait=True)
+
+    def _rodar(self):
+        try: asyncio.run(self.servir())
+        except Exception as e: self.erro = e
+        finally: self.pronto.set()
+
+    async def servir(self):
+        self.loop = asyncio.get_running_loop()
+        self.parar_evento = asyncio.Event()
+        self.fila = asyncio.Queue(MAX_FILA)
+        servidor = await asyncio.start_server(self._atender, self.host, self.porta, backlog=512)
+        self.porta = servidor.sockets[0].getsockname()[1] # Porta 0 = qualquer livre (benchmark)
+        gravador = asyncio.create_task(self._gravador())
+        self.pronto.set()
+        try:
+            await self.parar_evento.wait()
+        finally:
+            servidor.close(); await servidor.wait_closed()
+            try: await asyncio.wait_for(self.fila.join(), 5) # Grava o que já foi aceito
+            except asyncio.TimeoutError: pass
+            gravador.cancel()
+
+    # --- HTTP ---
+    async def _atender(self, reader, writer):
+        try:
+            try:
+                metodo, caminho, tipo_corpo, corpo = await asyncio.wait_for(self._ler(reader), TEMPO_LEITURA)
+                status, tipo, resposta = await self._rotear(metodo, caminho, tipo_corpo, corpo)
+            except asyncio.TimeoutError: status, tipo, resposta = self._json(408, {'ok': False, 'erro': "Tempo esgotado"})
+            except ErroHttp as e: status, tipo, resposta = self._json(e.status, {'ok': False, 'erro': str(e)})
+            except Exception as e:
+                log.exception("Servidor de pedidos: %r", e)
+                status, tipo, resposta = self._json(500, {'ok': False, 'erro': "Erro interno"})
+            cab = [f"HTTP/1.1 {status} {MOTIVOS.get(status, '')}", f"Content-Type: {tipo}", f"Content-Length: {len(resposta)}",
+                "Connection: close"]
+            writer.write(("\r\n".join(cab) + "\r\n\r\n").encode('latin-1') + resposta)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError): pass # Cliente desistiu
+        finally:
+            writer.close()
+
+    async def _ler(self, reader):
+        try: metodo, caminho, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+        except ValueError: raise ErroHttp(400, "Requisição inválida") from None
+        cabecalhos = {}
+        while True:
+            linha = await reader.readline()
+            if linha in (b'\r\n', b'\n', b''): break
+            chave, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[chave.strip().lower()] = valor.strip()
+        try: tamanho = int(cabecalhos.get('content-length', 0))
+        except ValueError: raise ErroHttp(400, "Content-Length inválido") from None
+        if tamanho > MAX_CORPO: raise ErroHttp(413, "Pedido grande demais")
+        corpo = await reader.readexactly(tamanho) if tamanho > 0 else b""
+        return metodo.upper(), caminho.split('?', 1)[0], cabecalhos.get('content-type', ''), corpo
+
+    def _json(self, status, obj):
+        return status, 'application/json; charset=utf-8', json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    async def _rotear(self, metodo, caminho, tipo_corpo, corpo):
+        # Sem CORS: o cardápio vem deste mesmo servidor. Exigir JSON obriga o navegador a pedir licença (preflight)
+        # antes de um POST vindo de outra página, e como a licença nunca é dada, site nenhum da rede lança pedido
+        if caminho == '/pedido':
+            if metodo != 'POST': raise ErroHttp(405, "Use POST")
+            if tipo_corpo.split(';')[0].strip().lower() != 'application/json': raise ErroHttp(415, "Envie o pedido como application/json")
+            with medir("servidor.pedido"): return await self._receber_pedido(corpo) # Da chegada à resposta, com a espera do lote
+        if caminho in ARQUIVOS and metodo == 'GET':
+            return 200, TIPOS[os.path.splitext(ARQUIVOS[caminho])[1]], self._estatico(ARQUIVOS[caminho])
+        raise ErroHttp(404, "Não encontrado")
+
+    def _estatico(self, nome):
+        # O próprio caixa serve o cardápio: QR code da mesa -> http://<caixa>:8765/?mesa=7
+        if nome not in self.estaticos:
+            try:
+                with open(os.path.join(PASTA, nome), 'rb') as f: self.estaticos[nome] = f.read()
+            except OSError: raise ErroHttp(404, "Não encontrado") from None
+        return self.estaticos[nome]
+
+    # --- PEDIDOS ---
+    def validar(self, dados):
+        # Confere o pedido no cache de produtos; devolve (mesa, [(id, qtd), ...], total)
+        if not self.catalogo.itens: raise ErroHttp(503, "Cardápio ainda carregando, tente de novo")
+        if not isinstance(dados, dict): raise ErroEntrada("Pedido inválido")
+        mesa = dados.get('mesa')
+        if isinstance(mesa, str) and mesa.strip().isdigit(): mesa = int(mesa)
+        if isinstance(mesa, bool) or not self.motor.mesas.valida(mesa): raise ErroEntrada("Mesa inválida")
+        itens = dados.get('itens')
+        if not isinstance(itens, list) or not itens: raise ErroEntrada("Pedido vazio")
+        if len(itens) > MAX_ITENS: raise ErroEntrada("Itens demais num pedido só")
+        linhas = []; pedidos = {}; achados = {}; desconhecidos = [] # achados: a linha lida uma vez só (a tela pode apagar o produto no meio)
+        for item in itens:
+            if not isinstance(item, dict): raise ErroEntrada("Item inválido")
+            qtd = item.get('qtd', 1)
+            if not isinstance(qtd, int) or isinstance(qtd, bool) or not 1 <= qtd <= MAX_QTD: raise ErroEntrada("Quantidade inválida")
+            pid = item.get('id')
+            if pid is None and isinstance(item.get('nome'), str): pid = self.catalogo.indice.por_nome_exato(item['nome'])
+            prod = self.catalogo.itens.get(pid) if isinstance(pid, int) else None
+            if prod is None: desconhecidos.append(str(item.get('nome') or item.get('id'))); continue
+            linhas.append((prod[0], qtd)); pedidos[prod[0]] = pedidos.get(prod[0], 0) + qtd; achados[prod[0]] = prod
+        if desconhecidos: raise ErroEntrada("Produto não encontrado: " + ", ".join(desconhecidos))
+        faltas = [(pid, achados[pid][1], qtd, achados[pid][3]) for pid, qtd in pedidos.items() if achados[pid][3] < qtd]
+        if faltas: raise SemEstoque(faltas) # Pelo cache; a conferência que vale é a da transação
+        return mesa, linhas, sum(achados[pid][2] * qtd for pid, qtd in linhas)
+
+    async def _receber_pedido(self, corpo):
+        try:
+            dados = json.loads(corpo.decode('utf-8'))
+            mesa, itens, total = self.validar(dados)
+        except (ValueError, ErroEntrada) as e: # JSONDecodeError e UnicodeDecodeError são ValueError
+            raise ErroHttp(400, str(e) if isinstance(e, ErroEntrada) else "JSON inválido") from None
+        except SemEstoque as e:
+            raise ErroHttp(409, f"Sem estoque: {e}") from None
+        pedido = Pedido(mesa, itens, self.loop.create_future())
+        try: self.fila.put_nowait(pedido)
+        except asyncio.QueueFull: raise ErroHttp(503, "Caixa ocupado, tente de novo") from None
+        resultado = await pedido.futuro # Sem prazo aqui: aceito na fila = vai ser gravado, não pode virar "tente de novo"
+        if isinstance(resultado, SemEstoque): raise ErroHttp(409, f"Sem estoque: {resultado}")
+        return self._json(201, {'ok': True, 'mesa': mesa, 'itens': sum(q for _, q in itens), 'total': round(total, 2)})
+
+    async def _gravador(self):
+        while True:
+            lote = [await self.fila.get()]
+            prazo = self.loop.time() + self.lote_ms / 1000
+            while len(lote) < self.max_lote:
+                try: lote.append(self.fila.get_nowait()); continue
+                except asyncio.QueueEmpty: pass
+                restante = prazo - self.loop.time()
+                if restante <= 0: break
+                try: lote.append(await asyncio.wait_for(self.fila.get(), restante))
+                except asyncio.TimeoutError: break
+            contar("servidor.pedidos", len(lote)); contar("servidor.lotes")
+            try:
+                with medir("servidor.gravar_lote"):
+                    resultados = await self.loop.run_in_executor(self.executor, self._gravar_lote, [(p.mesa, p.itens) for p in lote])
+            except Exception as e:
+                for p in lote:
+                    if not p.futuro.done(): p.futuro.set_exception(e)
+            else:
+                for p, res in zip(lote, resultados):
+                    if not p.futuro.done(): p.futuro.set_result(res)
+            finally:
+                for _ in lote: self.fila.task_done()
+
+    def _gravar_lote(self, pedidos):
+        # Roda no executor. O aviso sai antes de soltar o lock do banco: a tela recebe
+        # lotes e fechamentos de mesa (MotorVendas.fechar_mesa) na ordem dos COMMITs
+        with self.motor.db.lock:
+            resultados = self.motor.lancar_pedidos(pedidos)
+            lancados = []; linhas = [] # lancados = [(mesa, [(id, qtd), ...]), ...] que entraram
+            for (mesa, itens), res in zip(pedidos, resultados):
+                if not isinstance(res, SemEstoque): lancados.append((mesa, itens)); linhas.extend(res)
+            if lancados and self.ao_gravar:
+                try: self.ao_gravar(lancados, linhas)
+                except Exception as e: log.exception("Servidor de pedidos (aviso à tela): %r", e)
+        return resultados
+
+def main():
+    # Sem a tela (ex.: testes, outro computador servindo o cardápio): python servidor_pedidos.py
+    from migracoes import migrar
+    ap = argparse.ArgumentParser(description="Servidor de pedidos do cardápio digital do BANCART")
+    ap.add_argument("--banco", default=os.environ.get("BANCART_DB", "bancart_dados.db"))
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--porta", type=int, default=PORTA)
+    ap.add_argument("--mesas", type=int, default=20)
+    args = ap.parse_args()
+    banco = Banco(args.banco); migrar(banco)
+    motor = MotorVendas(banco, args.mesas); motor.catalogo.carregar(motor.listar_produtos()); motor.mesas.carregar(motor.resumo_mesas())
+    # Sem a tela, o próprio servidor mantém os caches em dia com o que gravou
+    servidor = ServidorPedidos(motor, args.host, args.porta,
+        ao_gravar=lambda lancados, linhas: servidor.loop.call_soon_threadsafe(motor.aplicar_lancamentos, lancados, linhas))
+    try: asyncio.run(servidor.servir())
+    except KeyboardInterrupt: pass
+    finally: servidor.executor.shutdown(wait=True); banco.fechar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# --- SINCRONIA ENTRE TERMINAIS ---
+# Vários terminais (balcão, garçons) gravando no mesmo arquivo. Cada escrita
+# deixa uma linha na tabela 'mudancas' (triggers da migração 6). O observador
+# pergunta ao SQLite se outra conexão gravou (PRAGMA data_version, que não lê
+# tabela nenhuma) e, só quando mudou, lê as linhas novas de 'mudancas' e
+# busca apenas os produtos e mesas citados. Nada de reler tabelas inteiras.
+#
+# verificar() roda na thread do banco; o resultado é aplicado na thread dona
+# dos caches (MotorVendas.aplicar_mudancas).
+
+from metricas import contar
+
+LIMITE = 5000 # Mudanças lidas de uma vez; mais que isso (ou buraco na sequência) = recarga completa
+
+class Mudancas:
+    def __init__(self, produtos=(), removidos=(), mesas=None, caixa=False, completo=False):
+        self.produtos = list(produtos) # Linhas de produto como estão agora
+        self.removidos = set(removidos) # Ids apagados
+        self.mesas = mesas or {} # mesa -> (itens, total, aberta_em), ou None se ficou livre
+        self.caixa = caixa # Entrou venda fechada: histórico do dia mudou
+        self.completo = completo # Produtos e mesas vieram inteiros (recarga)
+
+class ObservadorMudancas:
+    def __init__(self, banco, limite=LIMITE):
+        self.db = banco
+        self.limite = limite
+        self.seq = None
+        self.versao = None
+
+    def marcar(self):
+        # Ponto de partida: chamado ANTES da carga inicial, na mesma fila, para não perder nada entre uma e outra
+        self.versao = self.db.data_version()
+        self.seq = self.db.ultima_mudanca()
+
+    def verificar(self):
+        # Devolve Mudancas, ou None se nenhum outro terminal gravou desde a última vez
+        if self.seq is None: self.marcar(); return None
+        versao = self.db.data_version()
+        if versao == self.versao: return None
+        self.versao = versao
+        linhas = self.db.mudancas_desde(self.seq, self.limite)
+        if not linhas: return None
+        contar("sincronia.mudancas", len(linhas))
+        if linhas[0][0] != self.seq + 1 or len(linhas) == self.limite: return self._recarregar()
+        self.seq = linhas[-1][0]
+        produtos = set(); mesas = set(); caixa = False
+        for _, tipo, chave in linhas:
+            if tipo == 'produto': produtos.add(chave)
+            elif tipo == 'mesa': mesas.add(chave)
+            elif tipo == 'fechada': mesas.add(chave); caixa = True
+            elif tipo == 'caixa': caixa = True
+        achados = self.db.produtos_por_id(produtos) if produtos else []
+        estados = dict.fromkeys(mesas) # Mesa que não voltar no resumo ficou livre
+        if mesas: estados.update((l[0], (l[1], l[2], l[3])) for l in self.db.resumo_mesas(mesas))
+        return Mudancas(achados, produtos.difference(l[0] for l in achados), estados, caixa)
+
+    def _recarregar(self):
+        # Ficou para trás (ou a tabela foi podada): relê tudo uma vez e segue dali
+        self.seq = self.db.ultima_mudanca()
+        produtos = self.db.listar_produtos()
+        mesas = {l[0]: (l[1], l[2], l[3]) for l in self.db.resumo_mesas()}
+        return Mudancas(produtos, (), mesas, caixa=True, completo=True)
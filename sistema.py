@@ -1,9 +1,23 @@
+import time
+T_ABERTURA = time.perf_counter() # Marco zero do trace de abertura (antes até de importar o Tk)
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
-from datetime import datetime
-import shutil
+import logging
 import os
+import subprocess
+import sys
+from banco import Banco, SemEstoque
+from nucleo import MotorVendas, Carrinho, ErroEntrada, ler_produto, ler_quantidade, total_itens, hoje
+from migracoes import migrar, ErroMigracao
+from tarefas import FilaTarefas
+from backup import AgendadorBackup
+from servidor_pedidos import ServidorPedidos
+from lista_virtual import ListaVirtual, FonteLista
+from metricas import METRICAS, LIMITES_MS, medir, contar, texto_histograma, configurar_log, RegistradorMetricas
+import relatorios
+
+log = logging.getLogger("bancart")
 
 # --- CORES ---
 CORES = {
@@ -18,46 +32,29 @@ CORES = {
     'busca': '#505050'
 }
 
-DB_NAME = "bancart_dados.db"
-
-# --- BANCO DE DADOS (COM MIGRAÇÃO AUTOMÁTICA) ---
-def iniciar_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Cria tabelas básicas
-    c.execute("""CREATE TABLE IF NOT EXISTS produtos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT, preco REAL, estoque INTEGER, codigo TEXT
-    )""")
-    
-    c.execute("""CREATE TABLE IF NOT EXISTS vendas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        mesa_id INTEGER,
-        produto_nome TEXT, qtd INTEGER, total REAL,
-        data_hora TEXT, pagamento TEXT, status TEXT
-    )""")
-    
-    # VERIFICA SE A COLUNA 'CODIGO' EXISTE (Para quem já tem o banco antigo)
-    try:
-        c.execute("SELECT codigo FROM produtos LIMIT 1")
-    except sqlite3.OperationalError:
-        # Se der erro, é porque a coluna não existe. Vamos criar.
-        c.execute("ALTER TABLE produtos ADD COLUMN codigo TEXT")
-        print("Coluna 'codigo' adicionada com sucesso!")
-        
-    conn.commit(); conn.close()
-
-def fazer_backup():
-    if os.path.exists(DB_NAME):
-        if not os.path.exists("backups"): os.mkdir("backups")
-        data = datetime.now().strftime("%Y-%m-%d")
-        shutil.copy(DB_NAME, f"backups/backup_{data}.db")
+# Vários terminais no mesmo banco: aponte BANCART_DB para o mesmo arquivo em todos.
+# Na mesma máquina, WAL; arquivo numa pasta de rede, BANCART_JOURNAL=DELETE em todos.
+# Só um terminal (BANCART_PRINCIPAL=1, o padrão) faz backup e recebe os pedidos do cardápio.
+DB_NAME = os.environ.get("BANCART_DB", "bancart_dados.db")
+DB_JOURNAL = os.environ.get("BANCART_JOURNAL", "WAL").upper()
+PRINCIPAL = os.environ.get("BANCART_PRINCIPAL", "1") != "0"
+SYNC_MS = 300 # De quanto em quanto tempo pergunta se outro terminal gravou
+LIMITE_SUGESTOES = 50 # Máximo de produtos na lista do combobox enquanto digita
+BACKUP_INTERVALO_MIN = 60 # Cópia de segurança a cada X minutos...
+BACKUP_HORARIO = (8, 24) # ...entre estas horas (início, fim)
+NUM_MESAS = 20 # Quantas mesas o salão tem (botões numerados de 1 a NUM_MESAS)
+COLUNAS_MESAS = 4 # Botões por linha no mapa; com muitas mesas o mapa ganha barra de rolagem
+PORTA_PEDIDOS = 8765 # Cardápio digital manda os pedidos das mesas para cá (None = desligado)
+DIAGNOSTICO_MS = 2000 # Atualização da aba DIAGNÓSTICO enquanto ela estiver aberta
+METRICAS_LOG_S = 60 # Resumo das métricas gravado no log a cada X segundos
+PODA_MUDANCAS_MIN = 30 # Principal: de quanto em quanto tempo apaga o registro de mudanças antigo
 
 # --- SISTEMA ---
 class BancartApp:
-    def __init__(self, root):
+    def __init__(self, root, motor):
         self.root = root
+        self.motor = motor # Regras de negócio (nucleo.py); a tela só lê campos e mostra resultados
+        self.db = motor.db
         self.root.title("BANCART PRO 5.0 - Gestão Inteligente")
         self.root.geometry("1100x700")
         self.root.configure(bg=CORES['fundo'])
@@ -69,10 +66,30 @@ class BancartApp:
         style.configure("Treeview", background="#404040", foreground="white", fieldbackground="#404040", rowheight=25)
         style.map("Treeview", background=[('selected', CORES['azul'])])
 
-        self.carrinho_avulso = [] 
         self.mesa_atual = None
         self.id_produto_selecionado = None
-        self.lista_produtos_cache = [] # Cache para busca rápida
+        self.catalogo = motor.catalogo # Cache de produtos + índice para busca rápida
+        self.carrinho = Carrinho(self.catalogo)
+        self.catalogo.ouvir(self.ao_mudar_produto)
+        self.motor.mesas.ouvir(self.ao_mudar_mesa)
+        self.visual_mesa = {} # mesa -> (cor, texto) pintados no botão, para só mexer no que mudou
+        self.indice = self.catalogo.indice
+        self.busca_estoque = self.indice.nova_busca()
+        self.buscas_cb = {}
+        self.textos_cb = {} # id -> texto exibido nos comboboxes
+        self.fila = FilaTarefas(root, self.erro_tarefa) # Todo acesso ao banco passa por aqui
+        self.pendentes = set() # Áreas da tela esperando resposta do banco ('mesa', 'avulso', 'caixa')
+        self.comboboxes = [] # Comboboxes de produto das abas já montadas
+        self.lista_est = self.lista_hist = None # Criadas quando a aba é aberta pela primeira vez
+        self.carregando = {} # Etapas em segundo plano -> texto na barra de status
+        self.status_ocioso = "Pronto"
+        self.aberto = False
+        self.sem_sincronia = False # Aviso de falha na barra de status, até a próxima sincronia dar certo
+
+        # Barra de status: o que ainda está carregando em segundo plano
+        fr_status = tk.Frame(root, bg=CORES['painel']); fr_status.pack(side='bottom', fill='x')
+        self.lbl_status = tk.Label(fr_status, text="", bg=CORES['painel'], fg=CORES['texto'], font=('Arial', 9)); self.lbl_status.pack(side='left', padx=5)
+        self.progresso = ttk.Progressbar(fr_status, mode='indeterminate', length=120)
 
         self.abas = ttk.Notebook(root)
         self.abas.pack(fill='both', expand=True, padx=5, pady=5)
@@ -81,11 +98,76 @@ class BancartApp:
         self.aba_avulsa = tk.Frame(self.abas, bg=CORES['fundo']); self.abas.add(self.aba_avulsa, text=" 🛒  BALCÃO ")
         self.aba_estoque = tk.Frame(self.abas, bg=CORES['fundo']); self.abas.add(self.aba_estoque, text=" 📦  ESTOQUE ")
         self.aba_historico = tk.Frame(self.abas, bg=CORES['fundo']); self.abas.add(self.aba_historico, text=" 📅  CAIXA ")
+        self.aba_diagnostico = tk.Frame(self.abas, bg=CORES['fundo']); self.abas.add(self.aba_diagnostico, text=" 📊  DIAGNÓSTICO ")
 
+        # Só a aba MESAS é montada agora; as outras na primeira vez em que forem abertas
         self.montar_aba_mesas()
-        self.montar_aba_avulsa()
-        self.montar_aba_estoque()
-        self.montar_aba_historico()
+        self.a_montar = {str(self.aba_avulsa): self.montar_aba_avulsa, str(self.aba_estoque): self.montar_aba_estoque, str(self.aba_historico): self.montar_aba_historico,
+            str(self.aba_diagnostico): self.montar_aba_diagnostico}
+        self.abas.bind("<<NotebookTabChanged>>", self.ao_trocar_aba)
+        marcar_abertura("aba MESAS montada")
+
+    def ao_trocar_aba(self, event):
+        montar = self.a_montar.pop(self.abas.select(), None)
+        if montar is None: return
+        t = time.perf_counter()
+        with medir(f"tela.{montar.__name__}"): montar()
+        marcar_abertura(f"{montar.__name__} em {(time.perf_counter() - t) * 1000:.0f} ms")
+
+    # --- CARGA EM SEGUNDO PLANO ---
+    def iniciar_cargas(self):
+        # Chamado depois que a janela já apareceu
+        marcar_abertura("janela na tela")
+        self.fila.enviar(self.motor.marcar_sincronia) # Antes das cargas, na mesma fila: nada se perde entre uma e outra
+        self.carregar_mesas(); self.carregar_produtos()
+        self.root.after(SYNC_MS, self.sincronizar)
+
+    # --- OUTROS TERMINAIS ---
+    def sincronizar(self):
+        # Uma verificação por vez: a próxima só é agendada quando esta volta
+        self.fila.enviar(self.motor.buscar_mudancas, ao_terminar=self._mudancas_recebidas, ao_falhar=self._falha_sincronia)
+
+    def _mudancas_recebidas(self, mudancas):
+        if self.sem_sincronia: self.sem_sincronia = False; self.mostrar_status() # Voltou: tira o aviso
+        if mudancas:
+            self.motor.aplicar_mudancas(mudancas)
+            if self.mesa_atual in mudancas.mesas and 'mesa' not in self.pendentes: self.carregar_mesa()
+            if mudancas.caixa and self.lista_hist is not None and 'caixa' not in self.pendentes: self.carregar_historico()
+        self.root.after(SYNC_MS, self.sincronizar)
+
+    def _falha_sincronia(self, erro):
+        # Sem caixa de diálogo a cada SYNC_MS (ex.: pasta de rede caiu): avisa na barra e tenta de novo
+        self.sem_sincronia = True
+        self.lbl_status.config(text=f"⚠ Sem sincronia com os outros terminais: {erro}", fg=CORES['vermelho'])
+        self.root.after(SYNC_MS * 10, self.sincronizar)
+
+    def comecar_etapa(self, chave, texto):
+        self.carregando[chave] = texto; self.mostrar_status()
+
+    def terminar_etapa(self, chave):
+        if self.carregando.pop(chave, None) is None: return
+        if not self.aberto: marcar_abertura(f"{chave} pronto")
+        if not self.carregando and not self.aberto:
+            self.aberto = True; marcar_abertura("pronto para uso")
+        self.mostrar_status()
+
+    def mostrar_status(self):
+        if self.carregando:
+            self.lbl_status.config(text="⏳ " + " · ".join(self.carregando.values()) + "...", fg=CORES['amarelo'])
+            if not self.progresso.winfo_ismapped(): self.progresso.pack(side='right', padx=5, pady=2); self.progresso.start(15)
+        else:
+            self.progresso.stop(); self.progresso.pack_forget()
+            self.lbl_status.config(text=self.status_ocioso, fg=CORES['texto'])
+
+    def podar_mudancas(self):
+        # Só no principal. Toda baixa de estoque deixa uma linha em 'mudancas': poda na fila do banco, sem parar a tela
+        self.fila.enviar(self.db.podar_mudancas, ao_falhar=lambda erro: None) # Falha já vai para o log; tenta de novo na próxima
+        self.root.after(PODA_MUDANCAS_MIN * 60 * 1000, self.podar_mudancas)
+
+    def _backup_feito(self, arquivo, erro):
+        if erro: self.status_ocioso = f"⚠ Backup falhou: {erro}"
+        else: self.status_ocioso = f"💾 Último backup: {time.strftime('%H:%M')}"
+        self.terminar_etapa('backup'); self.mostrar_status()
 
     # --- ABA MESAS ---
     def montar_aba_mesas(self):
@@ -93,27 +175,38 @@ class BancartApp:
         fr_btn.place(relx=0.01, rely=0.02, relwidth=0.48, relheight=0.96)
         tk.Label(fr_btn, text="MAPA DE MESAS", bg=CORES['painel'], fg='white', font=('Arial', 12, 'bold')).pack(pady=10)
         
-        fr_grid = tk.Frame(fr_btn, bg=CORES['painel']); fr_grid.pack()
+        # Grade dentro de um Canvas: com muitas mesas, rola em vez de sair da tela
+        sb_mapa = ttk.Scrollbar(fr_btn, orient="vertical"); sb_mapa.pack(side='right', fill='y')
+        cv = tk.Canvas(fr_btn, bg=CORES['painel'], highlightthickness=0, yscrollcommand=sb_mapa.set); cv.pack(fill='both', expand=True)
+        sb_mapa.configure(command=cv.yview)
+        fr_grid = tk.Frame(cv, bg=CORES['painel']); cv.create_window((0, 0), window=fr_grid, anchor='n', tags='grade')
+        fr_grid.bind("<Configure>", lambda e: cv.configure(scrollregion=cv.bbox('all')))
+        cv.bind("<Configure>", lambda e: cv.coords('grade', e.width // 2, 0))
         self.btns_mesa = {}
-        for i in range(1, 21):
-            btn = tk.Button(fr_grid, text=f"MESA {i:02d}", width=9, height=3, bg=CORES['verde'], fg='white', font=('Arial', 9, 'bold'), command=lambda m=i: self.selecionar_mesa(m))
-            r, c = divmod(i-1, 4)
+        for i in range(1, self.motor.mesas.total + 1):
+            btn = tk.Button(fr_grid, text=self.texto_mesa(i, None), width=10, height=3, bg=CORES['verde'], fg='white', font=('Arial', 9, 'bold'), command=lambda m=i: self.selecionar_mesa(m))
+            r, c = divmod(i-1, COLUNAS_MESAS)
             btn.grid(row=r, column=c, padx=5, pady=5)
             self.btns_mesa[i] = btn
+            self.visual_mesa[i] = (CORES['verde'], btn.cget('text'))
         
         fr_det = tk.Frame(self.aba_mesas, bg=CORES['fundo'])
         fr_det.place(relx=0.5, rely=0.02, relwidth=0.49, relheight=0.96)
         self.lbl_mesa_sel = tk.Label(fr_det, text="Selecione uma Mesa", font=('Arial', 16, 'bold'), fg=CORES['amarelo'], bg=CORES['fundo']); self.lbl_mesa_sel.pack(pady=5)
         
-        self.tree_mesa = ttk.Treeview(fr_det, columns=('id','Item','Qtd','Total'), show='headings', height=10)
+        fr_lista = tk.Frame(fr_det, bg=CORES['fundo']); fr_lista.pack(fill='x')
+        self.tree_mesa = ttk.Treeview(fr_lista, columns=('id','Item','Qtd','Total'), show='headings', height=10)
         self.tree_mesa.heading('id', text='ID'); self.tree_mesa.column('id', width=30)
         self.tree_mesa.heading('Item', text='Produto'); self.tree_mesa.column('Item', width=200)
         self.tree_mesa.heading('Qtd', text='Qtd'); self.tree_mesa.column('Qtd', width=50)
         self.tree_mesa.heading('Total', text='R$'); self.tree_mesa.column('Total', width=80)
-        self.tree_mesa.pack(fill='x')
+        sb = ttk.Scrollbar(fr_lista, orient="vertical"); sb.pack(side='right', fill='y')
+        self.tree_mesa.pack(side='left', fill='x', expand=True)
+        self.lista_mesa = ListaVirtual(self.tree_mesa, sb, chave=lambda i: i[0], valores=lambda i: i, nome="mesa") # i = (id, produto, qtd, total)
 
         fr_add = tk.Frame(fr_det, bg=CORES['painel'], pady=5); fr_add.pack(fill='x', pady=5)
-        self.cb_prod_mesa = ttk.Combobox(fr_add, width=22); self.cb_prod_mesa.pack(side='left', padx=5)
+        self.cb_prod_mesa = ttk.Combobox(fr_add, width=22); self.cb_prod_mesa.pack(side='left', padx=5); self.comboboxes.append(self.cb_prod_mesa)
+        self.cb_prod_mesa.bind("<KeyRelease>", self.filtrar_combobox)
         self.ent_qtd_mesa = tk.Entry(fr_add, width=5); self.ent_qtd_mesa.insert(0,"1"); self.ent_qtd_mesa.pack(side='left', padx=5)
         tk.Button(fr_add, text="ADD", bg=CORES['azul'], fg='white', command=self.add_item_mesa).pack(side='left')
 
@@ -121,14 +214,14 @@ class BancartApp:
         tk.Label(fr_det, text="Pagamento:", bg=CORES['fundo'], fg='white').pack()
         self.cb_pag_mesa = ttk.Combobox(fr_det, values=["DINHEIRO", "PIX", "CRÉDITO", "DÉBITO"]); self.cb_pag_mesa.current(0); self.cb_pag_mesa.pack(pady=2)
         tk.Button(fr_det, text="FECHAR MESA", bg=CORES['vermelho'], fg='white', font=('Arial', 12, 'bold'), width=25, command=self.fechar_mesa).pack(pady=10)
-        self.atualizar_cores_mesas()
 
     # --- ABA BALCÃO ---
     def montar_aba_avulsa(self):
         fr_topo = tk.Frame(self.aba_avulsa, bg=CORES['painel'], pady=10); fr_topo.pack(fill='x')
         tk.Label(fr_topo, text="BALCÃO RÁPIDO", font=('Arial', 18, 'bold'), fg=CORES['laranja'], bg=CORES['painel']).pack()
         fr_inp = tk.Frame(fr_topo, bg=CORES['painel']); fr_inp.pack(pady=5)
-        self.cb_prod_avulso = ttk.Combobox(fr_inp, width=30, font=('Arial', 12)); self.cb_prod_avulso.pack(side='left', padx=5)
+        self.cb_prod_avulso = ttk.Combobox(fr_inp, width=30, font=('Arial', 12)); self.cb_prod_avulso.pack(side='left', padx=5); self.comboboxes.append(self.cb_prod_avulso)
+        self.cb_prod_avulso.bind("<KeyRelease>", self.filtrar_combobox)
         self.ent_qtd_avulso = tk.Entry(fr_inp, width=5, font=('Arial', 12)); self.ent_qtd_avulso.insert(0,"1"); self.ent_qtd_avulso.pack(side='left', padx=5)
         tk.Button(fr_inp, text="LANÇAR", bg=CORES['azul'], fg='white', command=self.add_carrinho_avulso).pack(side='left', padx=10)
         self.tree_avulso = ttk.Treeview(self.aba_avulsa, columns=('Prod','Qtd','Total'), show='headings', height=10)
@@ -140,6 +233,7 @@ class BancartApp:
         fr_pag = tk.Frame(fr_base, bg=CORES['painel']); fr_pag.pack(side='right', padx=20)
         self.cb_pag_avulso = ttk.Combobox(fr_pag, values=["DINHEIRO", "PIX", "CRÉDITO", "DÉBITO"]); self.cb_pag_avulso.current(0); self.cb_pag_avulso.pack()
         tk.Button(fr_pag, text="FINALIZAR", bg=CORES['verde'], fg='white', font=('Arial', 14), command=self.finalizar_avulso).pack(pady=5)
+        self.atualizar_comboboxes()
 
     # --- ABA ESTOQUE (ATUALIZADA) ---
     def montar_aba_estoque(self):
@@ -187,90 +281,146 @@ class BancartApp:
         self.tree_est.tag_configure('baixo', background=CORES['vermelho'], foreground='white')
         self.tree_est.bind("<<TreeviewSelect>>", self.ao_clicar_tabela)
         
-        # Scrollbar
-        sb = ttk.Scrollbar(self.aba_estoque, orient="vertical", command=self.tree_est.yview)
-        self.tree_est.configure(yscroll=sb.set)
+        # Scrollbar (controlada pela lista virtual: só as linhas visíveis ficam na Treeview)
+        sb = ttk.Scrollbar(self.aba_estoque, orient="vertical")
         sb.pack(side='right', fill='y')
         self.tree_est.pack(fill='both', expand=True, padx=10, pady=5)
+        self.lista_est = ListaVirtual(self.tree_est, sb, chave=lambda i: i[0], valores=self.valores_estoque, tags=self.tags_estoque, nome="estoque")
+        self.filtrar_estoque_digitacao(None)
 
     def montar_aba_historico(self):
         tk.Label(self.aba_historico, text="Vendas Hoje", font=('Arial', 14), bg=CORES['fundo'], fg=CORES['texto']).pack(pady=5)
-        self.tree_hist = ttk.Treeview(self.aba_historico, columns=('Hora','Tipo','Prod','Total','Pgto'), show='headings')
+        fr_lista = tk.Frame(self.aba_historico, bg=CORES['fundo']); fr_lista.pack(fill='both', expand=True, padx=10, pady=5)
+        self.tree_hist = ttk.Treeview(fr_lista, columns=('Hora','Tipo','Prod','Total','Pgto'), show='headings')
         self.tree_hist.heading('Hora', text='Hora'); self.tree_hist.column('Hora', width=80)
         self.tree_hist.heading('Tipo', text='Origem'); self.tree_hist.column('Tipo', width=100)
         self.tree_hist.heading('Prod', text='Produto'); self.tree_hist.column('Prod', width=200)
         self.tree_hist.heading('Total', text='Total'); self.tree_hist.column('Total', width=80)
         self.tree_hist.heading('Pgto', text='Pgto'); self.tree_hist.column('Pgto', width=100)
-        self.tree_hist.pack(fill='both', expand=True, padx=10, pady=5)
+        sb = ttk.Scrollbar(fr_lista, orient="vertical"); sb.pack(side='right', fill='y')
+        self.tree_hist.pack(side='left', fill='both', expand=True)
+        self.lista_hist = ListaVirtual(self.tree_hist, sb, chave=lambda v: v[5], valores=self.valores_historico, nome="caixa") # v = (data_hora, mesa, produto, total, pgto, id)
         self.lbl_fat = tk.Label(self.aba_historico, text="Total: R$ 0.00", font=('Arial', 16, 'bold'), fg=CORES['verde'], bg=CORES['fundo']); self.lbl_fat.pack(pady=10)
         
         fr_botoes = tk.Frame(self.aba_historico, bg=CORES['fundo'])
         fr_botoes.pack()
         tk.Button(fr_botoes, text="Atualizar Lista", command=self.carregar_historico).pack(side='left', padx=10)
         tk.Button(fr_botoes, text="📄 SALVAR RELATÓRIO DO DIA", bg=CORES['azul'], fg='white', font=('Arial', 10, 'bold'), command=self.salvar_relatorio_txt).pack(side='left', padx=10)
+        self.carregar_historico()
+
+    def montar_aba_diagnostico(self):
+        tk.Label(self.aba_diagnostico, text="Tempos das Operações (ms)", font=('Arial', 14), bg=CORES['fundo'], fg=CORES['texto']).pack(pady=5)
+        fr_lista = tk.Frame(self.aba_diagnostico, bg=CORES['fundo']); fr_lista.pack(fill='both', expand=True, padx=10, pady=5)
+        self.tree_diag = ttk.Treeview(fr_lista, columns=('Op','N','P50','P95','P99','Max','Hist'), show='headings')
+        for col, texto, largura in (('Op', 'Operação', 320), ('N', 'Vezes', 70), ('P50', 'p50', 70), ('P95', 'p95', 70), ('P99', 'p99', 70), ('Max', 'Máx', 70), ('Hist', 'Histograma', 130)):
+            self.tree_diag.heading(col, text=texto); self.tree_diag.column(col, width=largura, anchor='w' if col in ('Op', 'Hist') else 'e')
+        self.tree_diag.tag_configure('lento', foreground=CORES['laranja'])
+        sb = ttk.Scrollbar(fr_lista, orient="vertical", command=self.tree_diag.yview); sb.pack(side='right', fill='y')
+        self.tree_diag.configure(yscrollcommand=sb.set); self.tree_diag.pack(side='left', fill='both', expand=True)
+        faixas = " ".join(f"≤{l}" for l in LIMITES_MS) + f" >{LIMITES_MS[-1]}"
+        tk.Label(self.aba_diagnostico, text=f"Faixas do histograma (ms): {faixas}", font=('Arial', 9), bg=CORES['fundo'], fg=CORES['texto']).pack()
+        self.lbl_contadores = tk.Label(self.aba_diagnostico, text="", font=('Arial', 10), bg=CORES['fundo'], fg=CORES['amarelo'], wraplength=1000, justify='left'); self.lbl_contadores.pack(pady=5)
+
+        fr_botoes = tk.Frame(self.aba_diagnostico, bg=CORES['fundo'])
+        fr_botoes.pack(pady=5)
+        tk.Button(fr_botoes, text="Atualizar", command=self.mostrar_diagnostico).pack(side='left', padx=10)
+        tk.Button(fr_botoes, text="Zerar Medições", bg=CORES['vermelho'], fg='white', command=self.zerar_diagnostico).pack(side='left', padx=10)
+        self.atualizar_diagnostico()
+
+    def atualizar_diagnostico(self):
+        # Só redesenha com a aba na frente; escondida, o custo é uma comparação a cada DIAGNOSTICO_MS
+        if self.abas.select() == str(self.aba_diagnostico): self.mostrar_diagnostico()
+        self.root.after(DIAGNOSTICO_MS, self.atualizar_diagnostico)
+
+    def mostrar_diagnostico(self):
+        # Mesmo iid (nome da operação) a cada volta: linhas atualizadas no lugar, sem perder a rolagem
+        vistos = set()
+        for pos, (nome, total, p50, p95, p99, maximo, hist) in enumerate(METRICAS.resumo()):
+            valores = (nome, total, f"{p50:.1f}", f"{p95:.1f}", f"{p99:.1f}", f"{maximo:.1f}", texto_histograma(hist))
+            tags = ('lento',) if p99 >= METRICAS.lento_ms else ()
+            if self.tree_diag.exists(nome): self.tree_diag.item(nome, values=valores, tags=tags); self.tree_diag.move(nome, '', pos)
+            else: self.tree_diag.insert('', pos, iid=nome, values=valores, tags=tags)
+            vistos.add(nome)
+        for iid in self.tree_diag.get_children():
+            if iid not in vistos: self.tree_diag.delete(iid)
+        contadores = METRICAS.contadores_atuais()
+        self.lbl_contadores.config(text="   ·   ".join(f"{nome}: {n:,}".replace(',', '.') for nome, n in sorted(contadores.items())) or "Nenhum contador ainda")
+
+    def zerar_diagnostico(self):
+        METRICAS.zerar(); self.mostrar_diagnostico()
 
     # --- FUNÇÕES ---
     def carregar_produtos(self):
-        conn=sqlite3.connect(DB_NAME); c=conn.cursor()
-        # Carrega codigo também
-        itens=c.execute("SELECT id, nome, preco, estoque, codigo FROM produtos").fetchall()
-        conn.close()
-        
-        self.lista_produtos_cache = itens # Salva na memória para busca rápida
-        self.atualizar_tabela_estoque(itens)
-        
-        # Atualiza comboboxes
-        lista_cb = [f"{i[0]} - {i[1]} | R$ {i[2]:.2f}" for i in itens]
-        self.cb_prod_mesa['values'] = lista_cb
-        self.cb_prod_avulso['values'] = lista_cb
-
-    def atualizar_tabela_estoque(self, lista_itens):
-        self.tree_est.delete(*self.tree_est.get_children())
-        for i in lista_itens:
-            # i = (id, nome, preco, estoque, codigo)
-            tag = 'baixo' if i[3] < 5 else ''
-            # Tratamento caso codigo seja None
-            cod_show = i[4] if i[4] else "" 
-            self.tree_est.insert('', 'end', values=(i[0], cod_show, i[1], f"{i[2]:.2f}", i[3]), tags=(tag,))
-
-    def filtrar_estoque_digitacao(self, event):
-        termo = self.ent_busca_estoque.get().lower()
-        if not termo:
-            self.atualizar_tabela_estoque(self.lista_produtos_cache)
-            return
-        
-        filtrados = []
-        for item in self.lista_produtos_cache:
-            # item[1] é nome, item[4] é código
-            nome = str(item[1]).lower()
-            codigo = str(item[4]).lower() if item[4] else ""
-            
-            # Se o termo estiver no nome OU for igual ao código
-            if termo in nome or termo == codigo:
-                filtrados.append(item)
-        
-        self.atualizar_tabela_estoque(filtrados)
+        # Carga completa: só na abertura. Depois disso as mudanças chegam linha a linha (ao_mudar_produto)
+        self.comecar_etapa('produtos', "Carregando produtos")
+        self.fila.enviar(self.motor.listar_produtos, ao_terminar=self._produtos_carregados, ao_falhar=lambda erro: self._falha_carga('produtos', erro))
+
+    def _produtos_carregados(self, itens):
+        self.catalogo.carregar(itens); self.terminar_etapa('produtos')
+
+    def _falha_carga(self, chave, erro):
+        self.terminar_etapa(chave); self.erro_tarefa(erro)
+
+    def ao_mudar_produto(self, evento, pid, item):
+        if evento == 'carregado':
+            self.textos_cb = {i[0]: self.texto_cb(i) for i in self.catalogo.listar()}
+            self.atualizar_comboboxes()
+        elif evento == 'inserido':
+            self.textos_cb[pid] = self.texto_cb(item); self.atualizar_comboboxes()
+        elif evento == 'alterado':
+            if self.lista_est: self.lista_est.atualizar_linha(item) # Só mexe na Treeview se a linha estiver na tela
+            texto = self.texto_cb(item)
+            if self.textos_cb.get(pid) != texto: self.textos_cb[pid] = texto; self.atualizar_comboboxes()
+        elif evento == 'removido':
+            if self.textos_cb.pop(pid, None) is not None: self.atualizar_comboboxes()
+        if evento != 'alterado' or self.indice.versao != self.busca_estoque.versao:
+            self.filtrar_estoque_digitacao(None, topo=(evento == 'carregado')) # Mantém a busca que estava na tela
+
+    def texto_cb(self, i): return f"{i[0]} - {i[1]} | R$ {i[2]:.2f}"
+    def valores_estoque(self, i): return (i[0], i[4] if i[4] else "", i[1], f"{i[2]:.2f}", i[3]) # Tratamento caso codigo seja None
+    def tags_estoque(self, i): return ('baixo' if i[3] < 5 else '',)
+
+    def atualizar_comboboxes(self):
+        lista_cb = list(self.textos_cb.values())
+        for cb in self.comboboxes: cb['values'] = lista_cb
+
+    def filtrar_estoque_digitacao(self, event, topo=True):
+        # Código de barras exato ou trecho do nome (sem acento), via índice; a lista virtual desenha só a janela visível
+        if self.lista_est is None: return # Aba ESTOQUE ainda não foi aberta
+        with medir("tela.busca_estoque"):
+            ids = self.busca_estoque.filtrar(self.ent_busca_estoque.get())
+            self.lista_est.definir_fonte(FonteLista(ids, self.catalogo.itens.get), topo)
 
     def limpar_busca_estoque(self):
         self.ent_busca_estoque.delete(0, 'end')
-        self.atualizar_tabela_estoque(self.lista_produtos_cache)
+        self.busca_estoque.reiniciar()
+        self.filtrar_estoque_digitacao(None)
+
+    def filtrar_combobox(self, event):
+        cb = event.widget; termo = cb.get()
+        if event.keysym in ('Return', 'KP_Enter'):
+            # O leitor manda Enter no fim do código: só aí procura o código exato. A cada tecla, um código
+            # curto que é começo de outro ("789" e "7891...") escolheria o produto no meio da leitura
+            pid = self.indice.por_codigo_barras(termo)
+            if pid is not None: cb.set(self.textos_cb[pid]); cb['values'] = [self.textos_cb[pid]] # Bipou o código: já deixa o produto escolhido
+            return
+        if event.keysym in ('Up', 'Down', 'Escape', 'Tab'): return
+        busca = self.buscas_cb.setdefault(str(cb), self.indice.nova_busca())
+        with medir("tela.busca_combobox"): cb['values'] = [self.textos_cb[pid] for pid in busca.filtrar(termo)[:LIMITE_SUGESTOES]]
 
     def ao_clicar_tabela(self, event):
         sel=self.tree_est.selection()
         if sel:
-            # Pega valores da linha clicada
-            item=self.tree_est.item(sel[0])['values']
+            # Pega a linha do cache pelo iid (= id do produto)
+            item=self.catalogo.itens.get(int(sel[0]))
+            if not item: return
             self.id_produto_selecionado=item[0]
             
             # Preenche campos
-            self.ent_cod.delete(0, 'end'); self.ent_cod.insert(0, item[1]) # Codigo
-            self.ent_nome.delete(0,'end'); self.ent_nome.insert(0,item[2]) # Nome
-            
-            # Limpa R$ do preço
-            preco_limpo = str(item[3]).replace('R$ ', '').replace(',','.')
-            self.ent_preco.delete(0,'end'); self.ent_preco.insert(0, preco_limpo)
-            
-            self.ent_est.delete(0,'end'); self.ent_est.insert(0,item[4]) # Estoque
+            self.ent_cod.delete(0, 'end'); self.ent_cod.insert(0, item[4] or "") # Codigo
+            self.ent_nome.delete(0,'end'); self.ent_nome.insert(0,item[1]) # Nome
+            self.ent_preco.delete(0,'end'); self.ent_preco.insert(0, f"{item[2]:.2f}")
+            self.ent_est.delete(0,'end'); self.ent_est.insert(0,item[3]) # Estoque
 
     def limpar_campos_estoque(self): 
         self.id_produto_selecionado=None
@@ -280,145 +430,234 @@ class BancartApp:
         self.ent_est.delete(0,'end')
     
     def salvar_produto(self):
-        try:
-            n=self.ent_nome.get()
-            p=float(self.ent_preco.get().replace(',','.'))
-            e=int(self.ent_est.get())
-            cod=self.ent_cod.get() # Pega o código
-            
-            if not n: return
-            
-            conn=sqlite3.connect(DB_NAME)
-            conn.cursor().execute("INSERT INTO produtos (nome,preco,estoque,codigo) VALUES (?,?,?,?)",(n,p,e,cod))
-            conn.commit(); conn.close()
-            
-            self.limpar_campos_estoque()
-            self.carregar_produtos()
-            messagebox.showinfo("OK","Salvo!")
-        except: messagebox.showerror("Erro","Dados inválidos")
+        dados = (self.ent_nome.get(), self.ent_preco.get(), self.ent_est.get(), self.ent_cod.get())
+        self.fila.enviar(self.motor.salvar_produto, *dados, ao_terminar=self._produto_salvo, ao_falhar=lambda erro: self.erro_produto(erro, "Dados inválidos"))
+
+    def _produto_salvo(self, item):
+        self.catalogo.aplicar(item)
+        self.limpar_campos_estoque()
+        self.avisar(messagebox.showinfo, "OK", "Salvo!")
 
     def atualizar_produto(self):
         if not self.id_produto_selecionado: return
-        try:
-            n=self.ent_nome.get()
-            p=float(self.ent_preco.get().replace(',','.'))
-            e=int(self.ent_est.get())
-            cod=self.ent_cod.get()
-            
-            conn=sqlite3.connect(DB_NAME)
-            conn.cursor().execute("UPDATE produtos SET nome=?,preco=?,estoque=?,codigo=? WHERE id=?",(n,p,e,cod,self.id_produto_selecionado))
-            conn.commit(); conn.close()
-            
-            self.limpar_campos_estoque()
-            self.carregar_produtos()
-            self.limpar_busca_estoque() # Limpa a busca para ver a alteração
-            messagebox.showinfo("OK","Atualizado!")
-        except: messagebox.showerror("Erro","Erro ao atualizar")
+        dados = (self.ent_nome.get(), self.ent_preco.get(), self.ent_est.get(), self.ent_cod.get())
+        self.fila.enviar(self.motor.atualizar_produto, self.id_produto_selecionado, *dados, ao_terminar=self._produto_atualizado, ao_falhar=lambda erro: self.erro_produto(erro, "Erro ao atualizar"))
+
+    def _produto_atualizado(self, item):
+        if item: self.catalogo.aplicar(item)
+        self.limpar_campos_estoque()
+        self.limpar_busca_estoque() # Limpa a busca para ver a alteração
+        self.avisar(messagebox.showinfo, "OK", "Atualizado!")
+
+    def erro_produto(self, erro, msg):
+        if isinstance(erro, sqlite3.IntegrityError): self.avisar(messagebox.showerror, "Erro", "Código de barras já cadastrado")
+        elif isinstance(erro, ErroEntrada): self.avisar(messagebox.showerror, "Erro", str(erro))
+        else: self.avisar(messagebox.showerror, "Erro", msg)
 
     def excluir_produto(self):
         if self.id_produto_selecionado and messagebox.askyesno("Excluir","Apagar produto?"):
-            conn=sqlite3.connect(DB_NAME); conn.cursor().execute("DELETE FROM produtos WHERE id=?",(self.id_produto_selecionado,)); conn.commit(); conn.close()
-            self.limpar_campos_estoque(); self.carregar_produtos()
+            pid=self.id_produto_selecionado; self.limpar_campos_estoque()
+            self.fila.enviar(self.motor.excluir_produto, pid, ao_terminar=lambda _: self.catalogo.remover(pid))
+
+    # Cada ação de banco é um par: o método do botão lê a tela e envia a tarefa;
+    # o método "_..." (ou mostrar_...) recebe o resultado de volta na thread do Tk.
+    def marcar_pendente(self, chave, lbl):
+        if chave in self.pendentes: return False # Ainda processando o clique anterior
+        self.pendentes.add(chave); lbl.config(text="⏳ PROCESSANDO...", fg=CORES['amarelo'])
+        return True
+
+    def erro_tarefa(self, erro):
+        self.avisar(messagebox.showerror, "Erro", f"Erro no banco de dados: {erro}")
+
+    def avisar(self, dialogo, *args):
+        # Caixas de diálogo dos retornos abrem depois do retorno: a espera pelo OK do caixa não entra na métrica tela.*
+        self.root.after_idle(dialogo, *args)
 
     def selecionar_mesa(self, m):
         self.mesa_atual=m; self.lbl_mesa_sel.config(text=f"MESA {m:02d} - EM ABERTO"); self.carregar_mesa()
 
     def add_item_mesa(self):
         if not self.mesa_atual: messagebox.showwarning("!","Selecione uma mesa"); return
-        try:
-            prod=self.cb_prod_mesa.get(); qtd=int(self.ent_qtd_mesa.get()); pid=int(prod.split(' - ')[0])
-            conn=sqlite3.connect(DB_NAME); res=conn.cursor().execute("SELECT nome,preco,estoque FROM produtos WHERE id=?",(pid,)).fetchone()
-            if res[2]<qtd: messagebox.showerror("Erro","Sem estoque"); conn.close(); return
-            total=res[1]*qtd; dt=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            conn.cursor().execute("INSERT INTO vendas (mesa_id,produto_nome,qtd,total,data_hora,status) VALUES (?,?,?,?,?,?)",(self.mesa_atual,res[0],qtd,total,dt,'ABERTA'))
-            conn.cursor().execute("UPDATE produtos SET estoque=estoque-? WHERE id=?",(qtd,pid))
-            conn.commit(); conn.close(); self.carregar_mesa(); self.carregar_produtos(); self.atualizar_cores_mesas()
-        except: pass
+        try: pid=ler_produto(self.cb_prod_mesa.get()); qtd=ler_quantidade(self.ent_qtd_mesa.get())
+        except ErroEntrada as e: messagebox.showwarning("!", str(e)); return
+        mesa=self.mesa_atual
+        if not self.marcar_pendente('mesa', self.lbl_total_mesa): return
+        def tarefa():
+            linhas=self.motor.add_item_mesa(mesa,pid,qtd)
+            return linhas, self.motor.itens_mesa(mesa)
+        self.fila.enviar(tarefa, ao_terminar=lambda res: self._item_mesa_lancado(mesa, pid, qtd, *res), ao_falhar=self._falha_mesa)
+
+    def _item_mesa_lancado(self, mesa, pid, qtd, linhas, itens):
+        self.pendentes.discard('mesa')
+        self.motor.aplicar_lancamento(mesa, [(pid, qtd)], linhas); self.mostrar_mesa(mesa, itens)
+
+    def _falha_mesa(self, erro):
+        self.pendentes.discard('mesa'); self.carregar_mesa()
+        if isinstance(erro, SemEstoque): self.avisar(messagebox.showerror, "Erro", f"Sem estoque: {erro}")
+        else: self.erro_tarefa(erro)
 
     def carregar_mesa(self):
-        self.tree_mesa.delete(*self.tree_mesa.get_children()); total=0
-        conn=sqlite3.connect(DB_NAME); itens=conn.cursor().execute("SELECT id,produto_nome,qtd,total FROM vendas WHERE mesa_id=? AND status='ABERTA'",(self.mesa_atual,)).fetchall(); conn.close()
-        for i in itens: self.tree_mesa.insert('','end',values=i); total+=i[3]
-        self.lbl_total_mesa.config(text=f"TOTAL: R$ {total:.2f}")
+        mesa=self.mesa_atual
+        self.fila.enviar(self.motor.itens_mesa, mesa, ao_terminar=lambda itens: self.mostrar_mesa(mesa, itens))
+
+    def mostrar_mesa(self, mesa, itens):
+        if mesa != self.mesa_atual: return # Já trocaram de mesa enquanto carregava
+        self.lista_mesa.definir_fonte(FonteLista(itens)); total=total_itens(itens)
+        self.lbl_total_mesa.config(text=f"TOTAL: R$ {total:.2f}", fg=CORES['verde'])
 
     def fechar_mesa(self):
-        if not self.mesa_atual or not self.tree_mesa.get_children(): return
+        if not self.mesa_atual or not self.motor.mesas.estado(self.mesa_atual): return
         if messagebox.askyesno("Fechar", f"Fechar conta da Mesa {self.mesa_atual}?"):
-            conn=sqlite3.connect(DB_NAME)
-            conn.cursor().execute("UPDATE vendas SET status='FECHADA', pagamento=? WHERE mesa_id=? AND status='ABERTA'", (self.cb_pag_mesa.get(), self.mesa_atual))
-            conn.commit(); conn.close()
-            self.carregar_mesa(); self.atualizar_cores_mesas(); self.carregar_historico()
-            messagebox.showinfo("Sucesso", "Mesa fechada!")
-
-    def atualizar_cores_mesas(self):
-        conn = sqlite3.connect(DB_NAME); ocupadas = [x[0] for x in conn.cursor().execute("SELECT DISTINCT mesa_id FROM vendas WHERE status='ABERTA'").fetchall()]; conn.close()
-        for i in range(1, 21): self.btns_mesa[i].config(bg=CORES['vermelho'] if i in ocupadas else CORES['verde'])
+            mesa=self.mesa_atual; pag=self.cb_pag_mesa.get(); com_historico=self.lista_hist is not None
+            if not self.marcar_pendente('mesa', self.lbl_total_mesa): return
+            def tarefa():
+                self.motor.fechar_mesa(mesa, pag, ao_gravar=lambda m, estado: self.fila.na_tela(self.motor.mesas.definir, m, estado))
+                return self.motor.historico() if com_historico else None # CAIXA fechada ainda: carrega quando abrir
+            self.fila.enviar(tarefa, ao_terminar=lambda historico: self._mesa_fechada(mesa, historico), ao_falhar=self._falha_mesa)
+
+    def _mesa_fechada(self, mesa, historico):
+        self.pendentes.discard('mesa')
+        # O mapa já recebeu o estado lido após o COMMIT (ver tarefa); se entrou pedido do cardápio depois, mostra
+        if self.motor.mesas.estado(mesa) is None: self.mostrar_mesa(mesa, [])
+        else: self.carregar_mesa()
+        if historico: self.mostrar_historico(*historico)
+        self.avisar(messagebox.showinfo, "Sucesso", "Mesa fechada!")
+
+    def carregar_mesas(self):
+        # Só na abertura: daí em diante o mapa é corrigido por lançamento/fechamento
+        self.comecar_etapa('mesas', "Carregando mesas")
+        self.fila.enviar(self.motor.resumo_mesas, ao_terminar=self._mesas_carregadas, ao_falhar=lambda erro: self._falha_carga('mesas', erro))
+
+    def _mesas_carregadas(self, linhas):
+        self.motor.mesas.carregar(linhas); self.terminar_etapa('mesas')
+
+    def pedidos_recebidos(self, lancados, linhas):
+        # Lote gravado pelo servidor de pedidos (cardápio digital); chega via fila.na_tela
+        self.motor.aplicar_lancamentos(lancados, linhas)
+        if 'mesa' not in self.pendentes and any(m == self.mesa_atual for m, _ in lancados): self.carregar_mesa()
+
+    def ao_mudar_mesa(self, evento, mesa, estado):
+        if evento == 'carregado':
+            for m in self.btns_mesa: self.pintar_mesa(m, self.motor.mesas.estado(m))
+        else: self.pintar_mesa(mesa, estado)
+
+    def texto_mesa(self, mesa, estado):
+        if estado is None: return f"MESA {mesa:02d}"
+        itens, total, aberta_em = estado
+        return f"MESA {mesa:02d}\nR$ {total:.2f}\n{itens} it. · {aberta_em[11:16]}"
+
+    def pintar_mesa(self, mesa, estado):
+        btn = self.btns_mesa.get(mesa)
+        if btn is None: return
+        visual = (CORES['verde'] if estado is None else CORES['vermelho'], self.texto_mesa(mesa, estado))
+        if self.visual_mesa.get(mesa) == visual: return # Nada mudou: não mexe no widget
+        self.visual_mesa[mesa] = visual; btn.config(bg=visual[0], text=visual[1]); contar("tela.mesas_repintadas")
 
     def add_carrinho_avulso(self):
-        try:
-            prod_txt = self.cb_prod_avulso.get(); qtd = int(self.ent_qtd_avulso.get()); pid = int(prod_txt.split(' - ')[0])
-            conn = sqlite3.connect(DB_NAME); res = conn.cursor().execute("SELECT nome, preco, estoque FROM produtos WHERE id=?", (pid,)).fetchone(); conn.close()
-            if res[2] < qtd: messagebox.showerror("Erro", "Sem estoque!"); return
-            self.carrinho_avulso.append({'id': pid, 'nome': res[0], 'qtd': qtd, 'tot': res[1] * qtd}); self.atualizar_avulso()
-        except: pass
+        if 'avulso' in self.pendentes: return
+        try: self.carrinho.adicionar(ler_produto(self.cb_prod_avulso.get()), ler_quantidade(self.ent_qtd_avulso.get())) # Confere no cache, sem ir ao banco
+        except SemEstoque: messagebox.showerror("Erro", "Sem estoque!"); return
+        except ErroEntrada as e: messagebox.showwarning("!", str(e)); return
+        self.atualizar_avulso()
 
     def atualizar_avulso(self):
-        self.tree_avulso.delete(*self.tree_avulso.get_children()); geral = 0
-        for i in self.carrinho_avulso: self.tree_avulso.insert('', 'end', values=(i['nome'], i['qtd'], f"{i['tot']:.2f}")); geral += i['tot']
-        self.lbl_total_avulso.config(text=f"TOTAL: R$ {geral:.2f}")
+        self.tree_avulso.delete(*self.tree_avulso.get_children())
+        for i in self.carrinho.itens: self.tree_avulso.insert('', 'end', values=(i['nome'], i['qtd'], f"{i['tot']:.2f}"))
+        contar("tela.linhas_desenhadas", len(self.carrinho.itens))
+        self.lbl_total_avulso.config(text=f"TOTAL: R$ {self.carrinho.total():.2f}", fg=CORES['verde'])
 
-    def limpar_avulso(self): self.carrinho_avulso = []; self.atualizar_avulso()
+    def limpar_avulso(self):
+        if 'avulso' in self.pendentes: return
+        self.carrinho.limpar(); self.atualizar_avulso()
 
     def finalizar_avulso(self):
-        if not self.carrinho_avulso: return
+        if not self.carrinho.itens: return
         if messagebox.askyesno("Confirmar", "Finalizar venda?"):
-            conn = sqlite3.connect(DB_NAME); c = conn.cursor(); dt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            for item in self.carrinho_avulso:
-                c.execute("INSERT INTO vendas (mesa_id, produto_nome, qtd, total, data_hora, pagamento, status) VALUES (?,?,?,?,?,?,?)", (0, item['nome'], item['qtd'], item['tot'], dt, self.cb_pag_avulso.get(), 'FECHADA'))
-                c.execute("UPDATE produtos SET estoque = estoque - ? WHERE id=?", (item['qtd'], item['id']))
-            conn.commit(); conn.close(); self.limpar_avulso(); self.carregar_produtos(); self.carregar_historico(); messagebox.showinfo("Sucesso", "Venda OK!")
+            itens = list(self.carrinho.itens); pag = self.cb_pag_avulso.get(); com_historico = self.lista_hist is not None
+            if not self.marcar_pendente('avulso', self.lbl_total_avulso): return
+            def tarefa():
+                linhas = self.motor.finalizar_avulso(itens, pag)
+                return linhas, self.motor.historico() if com_historico else None
+            self.fila.enviar(tarefa, ao_terminar=lambda res: self._avulso_finalizado(*res), ao_falhar=self._falha_avulso)
+
+    def _avulso_finalizado(self, linhas, historico):
+        self.pendentes.discard('avulso')
+        self.motor.aplicar_produtos(linhas); self.limpar_avulso()
+        if historico: self.mostrar_historico(*historico)
+        self.avisar(messagebox.showinfo, "Sucesso", "Venda OK!")
+
+    def _falha_avulso(self, erro):
+        self.pendentes.discard('avulso'); self.atualizar_avulso()
+        if isinstance(erro, SemEstoque): self.avisar(messagebox.showerror, "Erro", f"Venda não gravada. Sem estoque: {erro}") # Carrinho fica como estava para corrigir
+        else: self.erro_tarefa(erro)
 
     def carregar_historico(self):
-        self.tree_hist.delete(*self.tree_hist.get_children()); dt_hoje = datetime.now().strftime("%Y-%m-%d"); fat = 0
-        conn = sqlite3.connect(DB_NAME); vendas = conn.cursor().execute(f"SELECT data_hora, mesa_id, produto_nome, total, pagamento FROM vendas WHERE status='FECHADA' AND data_hora LIKE '{dt_hoje}%' ORDER BY id DESC").fetchall(); conn.close()
-        for v in vendas:
-            origem = f"Mesa {v[1]}" if v[1] > 0 else "BALCÃO"
-            self.tree_hist.insert('', 'end', values=(v[0].split(' ')[1], origem, v[2], f"{v[3]:.2f}", v[4])); fat += v[3]
-        self.lbl_fat.config(text=f"Total: R$ {fat:.2f}")
+        if not self.marcar_pendente('caixa', self.lbl_fat): return
+        self.fila.enviar(self.motor.historico, ao_terminar=lambda res: self.mostrar_historico(*res), ao_falhar=self._falha_historico)
+
+    def _falha_historico(self, erro):
+        self.pendentes.discard('caixa'); self.lbl_fat.config(text="Total: R$ ?", fg=CORES['vermelho']); self.erro_tarefa(erro)
+
+    def mostrar_historico(self, vendas, fat):
+        self.pendentes.discard('caixa')
+        self.lista_hist.definir_fonte(FonteLista(vendas))
+        self.lbl_fat.config(text=f"Total: R$ {fat:.2f}", fg=CORES['verde'])
+
+    def valores_historico(self, v):
+        origem = f"Mesa {v[1]}" if v[1] > 0 else "BALCÃO"
+        return (v[0].split(' ')[1], origem, v[2], f"{v[3]:.2f}", v[4])
 
     def salvar_relatorio_txt(self):
-        dt_hoje = datetime.now().strftime("%Y-%m-%d")
+        dt_hoje = hoje()
         nome_arq = f"Relatorio_{dt_hoje}.txt"
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            vendas = conn.cursor().execute(f"SELECT data_hora, mesa_id, produto_nome, qtd, total, pagamento FROM vendas WHERE status='FECHADA' AND data_hora LIKE '{dt_hoje}%' ORDER BY id DESC").fetchall()
-            conn.close()
-            
-            if not vendas:
-                messagebox.showinfo("Vazio", "Nenhuma venda hoje para salvar.")
-                return
-
-            total_dia = 0
-            with open(nome_arq, "w", encoding='utf-8') as f:
-                f.write(f"=== RELATORIO DE VENDAS: {dt_hoje} ===\n\n")
-                f.write(f"{'HORA':<10} {'ORIGEM':<10} {'PRODUTO':<20} {'QTD':<5} {'TOTAL':<10} {'PAGAMENTO'}\n")
-                f.write("-" * 80 + "\n")
-                
-                for v in vendas:
-                    hora = v[0].split(' ')[1]
-                    origem = f"Mesa {v[1]}" if v[1] > 0 else "Balcão"
-                    prod = v[2][:20]
-                    f.write(f"{hora:<10} {origem:<10} {prod:<20} {v[3]:<5} R${v[4]:<8.2f} {v[5]}\n")
-                    total_dia += v[4]
-                
-                f.write("-" * 80 + "\n")
-                f.write(f"TOTAL DO DIA: R$ {total_dia:.2f}\n")
-                f.write("=" * 80)
-            
-            messagebox.showinfo("Sucesso", f"Relatório salvo como:\n{nome_arq}")
-            os.startfile(nome_arq)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao salvar: {e}")
+        self.fila.enviar(self.gravar_relatorio, dt_hoje, nome_arq, ao_terminar=lambda salvo: self.avisar(self._relatorio_salvo, salvo, nome_arq),
+            ao_falhar=lambda e: self.avisar(messagebox.showerror, "Erro", f"Erro ao salvar: {e}"))
+
+    def gravar_relatorio(self, dt_hoje, nome_arq):
+        # Roda na thread do banco; devolve False se não houve venda no dia (e não deixa arquivo vazio)
+        return relatorios.exportar_arquivo(self.db, nome_arq, 'txt', dt_hoje, dt_hoje, vazio=False) > 0
+
+    def _relatorio_salvo(self, salvo, nome_arq):
+        if not salvo:
+            messagebox.showinfo("Vazio", "Nenhuma venda hoje para salvar.")
+            return
+        messagebox.showinfo("Sucesso", f"Relatório salvo como:\n{nome_arq}")
+        try: abrir_arquivo(nome_arq)
+        except Exception as e: messagebox.showerror("Erro", f"Erro ao abrir: {e}")
+
+def marcar_abertura(etapa):
+    # Trace de abertura: tempo desde o duplo clique até cada etapa (na tela do terminal e no log)
+    ms = (time.perf_counter() - T_ABERTURA) * 1000
+    print(f"[abertura] {ms:6.0f} ms  {etapa}", file=sys.stderr); log.info("abertura %.0f ms: %s", ms, etapa)
+
+def abrir_arquivo(caminho):
+    if sys.platform == 'win32': os.startfile(caminho)
+    elif sys.platform == 'darwin': subprocess.Popen(['open', caminho])
+    else: subprocess.Popen(['xdg-open', caminho])
 
 if __name__ == "__main__":
-    iniciar_db(); fazer_backup(); root = tk.Tk(); app = BancartApp(root); app.carregar_produtos(); root.mainloop()
+    configurar_log() # Erros das threads (banco, backup, servidor) e o resumo das métricas
+    registrador = RegistradorMetricas(intervalo_s=METRICAS_LOG_S); registrador.iniciar()
+    banco = Banco(DB_NAME, DB_JOURNAL)
+    try: migrar(banco)
+    except ErroMigracao as e: # Aberto por atalho não tem terminal: o aviso tem que aparecer na tela
+        log.error("Migração parada: %s", e); banco.fechar()
+        tk.Tk().withdraw(); messagebox.showerror("BANCART - banco precisa de atenção", str(e)); raise SystemExit(1)
+    marcar_abertura("banco aberto")
+    root = tk.Tk(); app = BancartApp(root, MotorVendas(banco, NUM_MESAS))
+    backup = servidor = None
+    if PRINCIPAL:
+        backup = AgendadorBackup(DB_NAME, BACKUP_INTERVALO_MIN, *BACKUP_HORARIO,
+            ao_comecar=lambda: app.fila.na_tela(app.comecar_etapa, 'backup', "Fazendo backup"),
+            ao_terminar=lambda arquivo, erro: app.fila.na_tela(app._backup_feito, arquivo, erro))
+        backup.iniciar()
+    if PRINCIPAL and PORTA_PEDIDOS:
+        servidor = ServidorPedidos(app.motor, porta=PORTA_PEDIDOS, ao_gravar=lambda lancados, linhas: app.fila.na_tela(app.pedidos_recebidos, lancados, linhas))
+        servidor.iniciar()
+    root.after_idle(app.iniciar_cargas) # Produtos e mesas só depois que a janela aparece
+    if PRINCIPAL: root.after_idle(app.podar_mudancas) # Entra na fila depois das cargas
+    root.mainloop()
+    if servidor: servidor.parar()
+    if backup: backup.parar()
+    app.fila.encerrar(); banco.fechar()
+    registrador.parar()
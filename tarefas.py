@@ -0,0 +1,68 @@
+import logging
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metricas import METRICAS, medir
+
+log = logging.getLogger("bancart")
+
+# --- FILA DE TAREFAS EM SEGUNDO PLANO ---
+# Banco e disco rodam numa thread de trabalho; a thread do Tk só monta a tela.
+# Um único worker: as tarefas saem na ordem em que entraram (o SQLite só tem
+# um escritor de qualquer forma). O resultado volta por uma fila que o próprio
+# Tk esvazia via root.after, porque widgets só podem ser mexidos na thread dele.
+#
+# Cada tarefa é medida três vezes: espera na fila, execução no worker e o
+# retorno na thread do Tk (é ali que a tela trava se a atualização for pesada).
+# Caixas de diálogo não devem abrir dentro do retorno: a espera pelo OK seria
+# medida como se fosse a tela desenhando (ver BancartApp.avisar).
+
+def nome_tarefa(funcao):
+    # "BancartApp.add_item_mesa.<locals>.tarefa" -> "BancartApp.add_item_mesa"
+    nome = getattr(funcao, '__qualname__', None) or type(funcao).__name__
+    return nome.split('.<locals>')[0]
+
+class FilaTarefas:
+    def __init__(self, root, ao_falhar, intervalo_ms=30):
+        self.root = root
+        self.ao_falhar = ao_falhar # Tratador padrão de erro: ao_falhar(exc)
+        self.intervalo_ms = intervalo_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bancart-db")
+        self.prontas = queue.Queue()
+        self.root.after(self.intervalo_ms, self._despachar)
+
+    def enviar(self, funcao, *args, ao_terminar=None, ao_falhar=None):
+        nome = nome_tarefa(funcao); enviada = time.perf_counter()
+        def rodar():
+            METRICAS.registrar("fila.espera", (time.perf_counter() - enviada) * 1000)
+            with medir(f"banco.{nome}"): return funcao(*args)
+        futuro = self.executor.submit(rodar)
+        futuro.add_done_callback(lambda f: self.prontas.put((f, nome, ao_terminar, ao_falhar)))
+        return futuro
+
+    def na_tela(self, funcao, *args):
+        # Para outras threads (ex.: servidor de pedidos) pedirem algo à thread do Tk
+        futuro = Future(); futuro.set_result(None)
+        self.prontas.put((futuro, nome_tarefa(funcao), lambda _: funcao(*args), None))
+
+    def _despachar(self):
+        # Um retorno que quebra não pode parar a fila: os seguintes ainda são entregues e o ciclo continua
+        try:
+            while True:
+                try: futuro, nome, ao_terminar, ao_falhar = self.prontas.get_nowait()
+                except queue.Empty: break
+                erro = futuro.exception()
+                try:
+                    with medir(f"tela.{nome}"):
+                        if erro is not None:
+                            log.warning("Tarefa %s falhou: %r", nome, erro, exc_info=erro)
+                            (ao_falhar or self.ao_falhar)(erro)
+                        elif ao_terminar: ao_terminar(futuro.result())
+                except Exception:
+                    log.exception("Retorno da tarefa %s falhou na tela", nome)
+        finally:
+            self.root.after(self.intervalo_ms, self._despachar)
+
+    def encerrar(self):
+        self.executor.shutdown(wait=True)